@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Serialization cost per 10k tickets: FastAPI's default path (row -> dict ->
+jsonable_encoder -> json) vs. utils.fast_json.encode_tickets on db.Ticket rows.
+
+    python benchmarks/bench_serialization.py [--tickets 10000] [--repeat 20]
+"""
+import argparse, gzip, json, os, sys, tempfile, timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickets", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # db.py works on ./database.db; keep the benchmark data out of the real one
+    os.chdir(tempfile.mkdtemp())
+    from mini_jira_admin_agent import db
+    from utils import fast_json
+    from fastapi.encoders import jsonable_encoder
+
+    with db.get_conn() as conn:
+        conn.executemany("INSERT INTO users (id, name) VALUES (?, ?)", [(i, f"user{i}") for i in range(1, 101)])
+        conn.executemany(
+            "INSERT INTO tickets (title, assignee_id, status) VALUES (?, ?, ?)",
+            [(f"Ticket \"{i}\" – fix", i % 100 + 1, ("OPEN", "IN_PROGRESS", "CLOSED")[i % 3]) for i in range(args.tickets)],
+        )
+        conn.commit()
+
+    def default_path():
+        return json.dumps(jsonable_encoder({"tickets": [t._asdict() for t in db.list_tickets_all("ALL")]})).encode("utf-8")
+
+    def fast_path():
+        return fast_json.encode_tickets(db.list_tickets_all("ALL"))
+
+    assert default_path() == fast_path()
+    rows = db.list_tickets_all("ALL")
+    dicts = [t._asdict() for t in rows]
+    body = fast_path()
+
+    cases = [
+        ("query + dicts + jsonable_encoder + json", default_path),
+        ("query + Ticket rows + encode_tickets", fast_path),
+        ("serialize only: jsonable_encoder + json", lambda: json.dumps(jsonable_encoder({"tickets": dicts}))),
+        ("serialize only: encode_tickets", lambda: fast_json.encode_tickets(rows)),
+        ("gzip level 6", lambda: gzip.compress(body, compresslevel=6)),
+    ]
+    if fast_json.brotli is not None:
+        cases.append(("brotli quality 5", lambda: fast_json.brotli.compress(body, quality=5)))
+
+    scale = 10_000 / args.tickets
+    print(f"{args.tickets} tickets, body {len(body)} bytes, gzip {len(gzip.compress(body))} bytes")
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{name:<45} {best * 1000 * scale:8.2f} ms / 10k tickets")
+
+
+if __name__ == "__main__":
+    main()
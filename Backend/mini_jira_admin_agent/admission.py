@@ -0,0 +1,175 @@
+import math, threading, time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Tuple
+
+from .config import LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT, CHAT_RATE_PER_MIN, CHAT_BURST
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; retry_after is a hint in seconds (for Retry-After)."""
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    Bounded concurrency + bounded queue for LLM calls.
+
+    - admit() / reserve()+release(): hold one of max_concurrent + max_queue places for a
+      whole request, failing fast with Overloaded when full (before any thread is used).
+    - slot() / acquire_slot()+release_slot(): hold one of max_concurrent running places
+      around the LLM call itself, waiting in FIFO-ish order up to queue_timeout.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._admitted = 0
+        self._running = 0
+        self._waiting = 0
+        self._queue_times = deque(maxlen=512)    # seconds spent waiting for a slot
+        self._service_times = deque(maxlen=512)  # seconds holding a slot
+        self.shed = 0
+        self.timeouts = 0
+        self.completed = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_concurrent + self.max_queue
+
+    def retry_after(self) -> int:
+        with self._cond:
+            avg = sum(self._service_times) / len(self._service_times) if self._service_times else 1.0
+            backlog = self._waiting + 1
+        return max(1, math.ceil(avg * backlog / self.max_concurrent))
+
+    def reserve(self) -> None:
+        "Take an admit() place without a with-block; pair with release() (e.g. from a future's done callback)."
+        with self._cond:
+            full = self._admitted >= self.capacity
+            if full:
+                self.shed += 1
+            else:
+                self._admitted += 1
+        if full:
+            raise Overloaded("Chat queue is full, try again later.", self.retry_after())
+
+    def release(self) -> None:
+        with self._cond:
+            self._admitted -= 1
+
+    @contextmanager
+    def admit(self):
+        self.reserve()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire_slot(self) -> Tuple[float, float]:
+        """
+        Wait for one of max_concurrent running places without a with-block; pass the
+        returned token to release_slot() (e.g. from the LLM call's done callback).
+        """
+        enqueued = time.perf_counter()
+        with self._cond:
+            if self._running >= self.max_concurrent and self._waiting >= self.max_queue:
+                self.shed += 1
+                shed = True
+            else:
+                shed = False
+                self._waiting += 1
+                ok = self._cond.wait_for(lambda: self._running < self.max_concurrent, self.queue_timeout)
+                self._waiting -= 1
+                if ok:
+                    self._running += 1
+                else:
+                    self.timeouts += 1
+        if shed:
+            raise Overloaded("LLM queue is full, try again later.", self.retry_after())
+        if not ok:
+            raise Overloaded(f"Timed out after {self.queue_timeout:.0f}s waiting for the LLM.", self.retry_after())
+        return enqueued, time.perf_counter()
+
+    def release_slot(self, token: Tuple[float, float]) -> None:
+        enqueued, started = token
+        finished = time.perf_counter()
+        with self._cond:
+            self._running -= 1
+            self.completed += 1
+            self._queue_times.append(started - enqueued)
+            self._service_times.append(finished - started)
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        token = self.acquire_slot()
+        try:
+            yield
+        finally:
+            self.release_slot(token)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            q = sorted(self._queue_times)
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "admitted": self._admitted,
+                "running": self._running,
+                "waiting": self._waiting,
+                "completed": self.completed,
+                "shed": self.shed,
+                "timeouts": self.timeouts,
+                "queue_ms_avg": round(1000 * sum(q) / len(q), 2) if q else 0.0,
+                "queue_ms_p95": round(1000 * q[int(0.95 * (len(q) - 1))], 2) if q else 0.0,
+                "queue_ms_max": round(1000 * q[-1], 2) if q else 0.0,
+            }
+
+
+class RateLimiter:
+    """Per-client token bucket: `rate_per_min` sustained, bursts up to `burst`. rate 0 disables it."""
+
+    def __init__(self, rate_per_min: float, burst: int, max_clients: int = 10000):
+        self.rate = rate_per_min / 60.0
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, list] = {}   # client -> [tokens, last_refill]
+        self.limited = 0
+
+    def check(self, client: str) -> float:
+        "Take one token for client; return 0 if allowed, else seconds until one is available."
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._prune(now)
+                bucket = self._buckets[client] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0.0
+            bucket[0] = tokens
+            self.limited += 1
+            return (1 - tokens) / self.rate
+
+    def _prune(self, now: float) -> None:
+        # drop clients whose bucket has refilled completely; they carry no state
+        full_after = self.burst / self.rate
+        for client, (_, last) in list(self._buckets.items()):
+            if now - last >= full_after:
+                del self._buckets[client]
+
+
+# shared by graph._router_call (slot) and server.chat (admit)
+llm_gate = AdmissionGate(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT)
+chat_limiter = RateLimiter(CHAT_RATE_PER_MIN, CHAT_BURST)
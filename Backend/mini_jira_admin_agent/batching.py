@@ -0,0 +1,170 @@
+import logging, queue, threading, time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Tuple
+
+from .admission import Overloaded
+from .config import ModelPool, get_pool, LLM_MAX_CONCURRENCY, ROUTER_BATCH_WINDOW_MS, ROUTER_BATCH_MAX_SIZE, ROUTER_CALL_TIMEOUT
+
+logger = logging.getLogger("mini_jira")
+
+
+def _resolve(fut: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    "Set a future's outcome unless it already has one (e.g. cancelled by a timed-out invoke())."
+    try:
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class BatchDispatcher:
+    """
+    Collects router prompts that arrive within `window_ms` of each other (up to
+    `max_batch`) and sends them as one batch: prompts are spread over the pool's
+    endpoints by least load, and each endpoint gets its share through llm.batch()
+    so they run concurrently instead of one request at a time.
+    A prompt whose endpoint fails is retried once on another healthy endpoint.
+    invoke()/wait() give up after `timeout` seconds.
+    """
+
+    def __init__(self, pool: Optional[ModelPool] = None, window_ms: float = ROUTER_BATCH_WINDOW_MS,
+                 max_batch: int = ROUTER_BATCH_MAX_SIZE, timeout: float = ROUTER_CALL_TIMEOUT,
+                 senders: int = LLM_MAX_CONCURRENCY):
+        self._pool = pool
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.timeout = timeout
+        self._queue: "queue.Queue[Tuple[Any, Future, int]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._senders = ThreadPoolExecutor(max_workers=max(1, senders), thread_name_prefix="router-batch")
+        self.batches = 0
+        self.prompts = 0
+        self.retries = 0
+        self.largest_batch = 0
+        self.timeouts = 0
+        self.orphaned = 0
+
+    @property
+    def pool(self) -> ModelPool:
+        if self._pool is None:
+            self._pool = get_pool()
+        return self._pool
+
+    def submit(self, messages) -> Future:
+        "Queue one chat prompt (list of messages); the Future resolves to the AIMessage."
+        self._start()
+        fut: Future = Future()
+        self._queue.put((messages, fut, 0))
+        return fut
+
+    def invoke(self, messages):
+        return self.wait(self.submit(messages))
+
+    def wait(self, fut: Future):
+        """
+        Result of a submitted prompt, or Overloaded after `timeout` seconds. A prompt
+        that is still queued is dropped; one already sent to Ollama cannot be stopped
+        and is counted as orphaned (its future resolves when the call ends, so callers
+        that hold a concurrency slot should release it from a done callback).
+        """
+        try:
+            return fut.result(timeout=self.timeout)
+        except FutureTimeout:
+            dropped = fut.cancel()    # only succeeds while the prompt is still queued
+            with self._lock:
+                self.timeouts += 1
+                if not dropped:
+                    self.orphaned += 1
+            raise Overloaded(f"Timed out after {self.timeout:.0f}s waiting for the router model.") from None
+
+    def _start(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="router-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[Any, Future, int]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            # a taken prompt can no longer be cancelled; retries are already running
+            batch = [item for item in self._collect() if item[2] > 0 or item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            with self._lock:
+                self.batches += 1
+                self.prompts += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+            # reserve endpoints up front so a batch spreads across the pool
+            groups: Dict[int, Tuple[Any, list]] = {}
+            dispatched = set()
+            try:
+                for item in batch:
+                    ep = self.pool.pick()
+                    groups.setdefault(id(ep), (ep, []))[1].append(item)
+                for key, (ep, items) in list(groups.items()):
+                    self._senders.submit(self._send, ep, items)
+                    del groups[key]
+                    dispatched.update(id(fut) for _, fut, _ in items)
+            except Exception as e:
+                # never let the worker die: release what was reserved and fail what was not sent
+                logger.exception("Router batch dispatch failed")
+                for ep, items in groups.values():
+                    for _ in items:
+                        self.pool.unpick(ep)
+                for _, fut, _ in batch:
+                    if id(fut) not in dispatched:
+                        _resolve(fut, error=e)
+
+    def _send(self, ep, items) -> None:
+        try:
+            results = ep.llm.batch([m for m, _, _ in items], return_exceptions=True)
+        except Exception as e:
+            results = [e] * len(items)
+        failed = any(isinstance(res, Exception) for res in results)
+        # release before retrying so the retry prefers another (now healthier) endpoint;
+        # a failed call marks this endpoint unhealthy until a check or call succeeds
+        for _ in items:
+            self.pool.release(ep, ok=not failed)
+        for (messages, fut, attempt), res in zip(items, results):
+            if not isinstance(res, Exception):
+                _resolve(fut, res)
+            elif attempt == 0 and len(self.pool.endpoints) > 1 and not fut.done():
+                with self._lock:
+                    self.retries += 1
+                self._queue.put((messages, fut, attempt + 1))
+            else:
+                _resolve(fut, error=res)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            avg = self.prompts / self.batches if self.batches else 0.0
+            return {
+                "batches": self.batches,
+                "prompts": self.prompts,
+                "avg_batch": round(avg, 2),
+                "largest_batch": self.largest_batch,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "orphaned": self.orphaned,
+                "endpoints": self.pool.stats(),
+            }
+
+
+router_dispatcher = BatchDispatcher()
@@ -1,9 +1,173 @@
 # Ollama -> llama3
-import os
+import os, threading, time, itertools, urllib.request
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any
 from langchain_ollama import ChatOllama  
 
 MODEL_NAME = os.getenv("MODEL_NAME", "llama3")
 BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+# Pool of Ollama servers for the router, comma separated; defaults to the single BASE_URL
+BASE_URLS = [u.strip() for u in os.getenv("OLLAMA_BASE_URLS", BASE_URL).split(",") if u.strip()]
+if not BASE_URLS:
+    raise ValueError("OLLAMA_BASE_URLS lists no URLs; unset it to use OLLAMA_BASE_URL.")
+HEALTH_CHECK_INTERVAL = float(os.getenv("OLLAMA_HEALTH_CHECK_INTERVAL", "15"))  # seconds, 0 disables
+# without health checks, an endpoint marked down after a failed call gets a trial call after this many seconds
+RETRY_UNHEALTHY_AFTER = float(os.getenv("OLLAMA_RETRY_UNHEALTHY_AFTER", "30"))
+# Router output constraint: "schema" (JSON schema per intent), "json" (any JSON, older Ollama) or "none"
+ROUTER_OUTPUT_FORMAT = os.getenv("ROUTER_OUTPUT_FORMAT", "schema").lower()
 
-def get_llm():
-    return ChatOllama(model=MODEL_NAME, base_url=BASE_URL, temperature=0.2)
+# Nearest-neighbor pre-router (see intent_index.py); files are <path>.npy / <path>.json
+INTENT_INDEX_PATH = os.getenv("INTENT_INDEX_PATH", "intent_index")
+PREROUTE_MIN_CONFIDENCE = float(os.getenv("PREROUTE_MIN_CONFIDENCE", "0.75"))  # cosine similarity of nearest example
+PREROUTE_MIN_MARGIN = float(os.getenv("PREROUTE_MIN_MARGIN", "0.15"))          # lead over the nearest other intent
+INTENT_INDEX_LEARN = os.getenv("INTENT_INDEX_LEARN", "1") == "1"              # add confirmed LLM routes to the index
+INTENT_INDEX_MAX_LEARNED = int(os.getenv("INTENT_INDEX_MAX_LEARNED", "1000"))  # learning stops after this many
+
+# Profiling / slow-request capture (see profiling.py); admin endpoints are off unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_BUFFER = int(os.getenv("SLOW_REQUEST_BUFFER", "100"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+
+# Admission control for LLM-bound chat traffic (see admission.py)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))     # router calls running at once
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))                # waiting beyond that -> 429
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))      # seconds a queued call may wait
+ROUTER_CALL_TIMEOUT = float(os.getenv("ROUTER_CALL_TIMEOUT", str(4 * LLM_QUEUE_TIMEOUT)))  # batch wait + Ollama time
+CHAT_RATE_PER_MIN = float(os.getenv("CHAT_RATE_PER_MIN", "30"))      # per client, 0 disables
+CHAT_BURST = int(os.getenv("CHAT_BURST", "10"))
+
+# Router batching (see batching.py). llm_gate lets at most LLM_MAX_CONCURRENCY router
+# prompts be in flight, so batches never get bigger than that and the dispatcher
+# needs at most that many sender threads (one per endpoint share of a batch).
+ROUTER_BATCH_WINDOW_MS = float(os.getenv("ROUTER_BATCH_WINDOW_MS", "10"))
+ROUTER_BATCH_MAX_SIZE = min(int(os.getenv("ROUTER_BATCH_MAX_SIZE", str(LLM_MAX_CONCURRENCY))), LLM_MAX_CONCURRENCY)
+
+def get_llm(base_url: str = BASE_URL, format=None):
+    return ChatOllama(model=MODEL_NAME, base_url=base_url, temperature=0.2, format=format)
+
+def router_format():
+    "Value for ChatOllama(format=...) used by the router, per ROUTER_OUTPUT_FORMAT."
+    if ROUTER_OUTPUT_FORMAT == "schema":
+        from .router_schema import ROUTER_JSON_SCHEMA
+        return ROUTER_JSON_SCHEMA
+    return "json" if ROUTER_OUTPUT_FORMAT == "json" else None
+
+class Endpoint:
+    """One Ollama server in the pool, with its in-flight count and health."""
+    def __init__(self, url: str, llm):
+        self.url = url.rstrip("/")
+        self.llm = llm
+        self.in_flight = 0
+        self.healthy = True
+        self.failures = 0
+        self.served = 0
+        self.last_check = 0.0
+
+class ModelPool:
+    """
+    Least-loaded selection over several Ollama endpoints. Endpoints that fail a
+    call or a health check (GET /api/tags) are skipped until a check passes again;
+    with the background checker off they are tried again after retry_unhealthy seconds.
+    """
+    def __init__(self, urls: List[str], make_llm=None, health_interval: float = HEALTH_CHECK_INTERVAL,
+                 retry_unhealthy: float = RETRY_UNHEALTHY_AFTER):
+        if not urls:
+            raise ValueError("ModelPool needs at least one endpoint URL.")
+        make_llm = make_llm or (lambda url: get_llm(url, format=router_format()))
+        self.endpoints = [Endpoint(u, make_llm(u)) for u in urls]
+        self.health_interval = health_interval
+        self.retry_unhealthy = retry_unhealthy
+        self._lock = threading.Lock()
+        self._rr = itertools.count()
+        self._checker = None
+
+    def pick(self) -> Endpoint:
+        "Reserve the healthy endpoint with the fewest calls in flight (release() when done)."
+        self.ensure_health_checks()
+        with self._lock:
+            if self._checker is None:
+                # nothing else re-checks a failed endpoint: once it has been down long
+                # enough, let the next call be its probe (a failure marks it down again)
+                now = time.time()
+                for e in self.endpoints:
+                    if not e.healthy and now - e.last_check >= self.retry_unhealthy:
+                        e.healthy = True
+            candidates = [e for e in self.endpoints if e.healthy] or self.endpoints  # all down: try anyway
+            low = min(e.in_flight for e in candidates)
+            least = [e for e in candidates if e.in_flight == low]
+            ep = least[next(self._rr) % len(least)]
+            ep.in_flight += 1
+            return ep
+
+    def release(self, ep: Endpoint, ok: bool = True) -> None:
+        with self._lock:
+            ep.in_flight -= 1
+            ep.served += 1
+            if ok:
+                ep.healthy = True
+            else:
+                ep.failures += 1
+                ep.healthy = False
+                ep.last_check = time.time()
+
+    def unpick(self, ep: Endpoint) -> None:
+        "Undo a pick() whose call was never sent (no effect on health or served counts)."
+        with self._lock:
+            ep.in_flight -= 1
+
+    @contextmanager
+    def acquire(self):
+        ep = self.pick()
+        ok = False
+        try:
+            yield ep
+            ok = True
+        finally:
+            self.release(ep, ok)
+
+    def check(self, ep: Endpoint, timeout: float = 2.0) -> bool:
+        try:
+            with urllib.request.urlopen(f"{ep.url}/api/tags", timeout=timeout) as r:
+                healthy = r.status == 200
+        except Exception:
+            healthy = False
+        with self._lock:
+            ep.healthy = healthy
+            ep.last_check = time.time()
+        return healthy
+
+    def check_all(self) -> None:
+        for ep in self.endpoints:
+            self.check(ep)
+
+    def ensure_health_checks(self) -> None:
+        "Start the background health checker once (only useful with more than one endpoint)."
+        if self._checker is not None or self.health_interval <= 0 or len(self.endpoints) < 2:
+            return
+        with self._lock:
+            if self._checker is not None:
+                return
+            def loop():
+                while True:
+                    self.check_all()
+                    time.sleep(self.health_interval)
+            self._checker = threading.Thread(target=loop, name="ollama-health", daemon=True)
+            self._checker.start()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"url": e.url, "healthy": e.healthy, "in_flight": e.in_flight, "served": e.served, "failures": e.failures}
+                for e in self.endpoints
+            ]
+
+_pool: Optional[ModelPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ModelPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ModelPool(BASE_URLS)
+        return _pool
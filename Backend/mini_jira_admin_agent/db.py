@@ -1,5 +1,31 @@
 import sqlite3, argparse
-from typing import List, Dict, Any
+from typing import List, NamedTuple, Optional
+from .profiling import phase
+
+class Ticket(NamedTuple):
+    """One ticket row joined with its assignee's name (a tuple: no per-row dict)."""
+    id: int
+    title: str
+    assignee_id: int
+    assignee: str
+    status: str
+
+TICKET_COLUMNS = Ticket._fields
+
+def _ticket_row(cursor, row) -> Ticket:
+    return Ticket._make(row)
+
+# many tickets per assignee: no UNIQUE on assignee_id, lookups go through the index
+TICKETS_DDL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        assignee_id INTEGER NOT NULL,
+        status TEXT CHECK(status IN ('OPEN', 'IN_PROGRESS', 'CLOSED')) DEFAULT 'OPEN',
+        FOREIGN KEY (assignee_id) REFERENCES users(id)
+    )
+"""
+TICKETS_INDEX_DDL = "CREATE INDEX IF NOT EXISTS idx_tickets_assignee_id ON tickets(assignee_id)"
 
 # establishing connection
 def get_conn():
@@ -8,6 +34,11 @@ def get_conn():
     conn.execute("PRAGMA foreign_keys = ON;") # explicitly giving foreign key constraint
     return conn
 
+def _ticket_cursor(conn):
+    cur = conn.cursor()
+    cur.row_factory = _ticket_row
+    return cur
+
 # if database does not exists
 def init_db():
     conn = sqlite3.connect("./database.db") # file path
@@ -20,23 +51,45 @@ def init_db():
     )
     """)
 
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS tickets (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT,
-        assignee_id INTEGER NOT NULL UNIQUE,
-        status TEXT CHECK(status IN ('OPEN', 'IN_PROGRESS', 'CLOSED')) DEFAULT 'OPEN',
-        FOREIGN KEY (assignee_id) REFERENCES users(id)
-    )
-    """)
+    cursor.execute(TICKETS_DDL.format(name="tickets"))
+    cursor.execute(TICKETS_INDEX_DDL)
 
     conn.commit()
     conn.close()
 
     print("Database and tables created successfully.")
 
+def migrate_db() -> bool:
+    """
+    Upgrade a database created with the old one-ticket-per-user schema
+    (tickets.assignee_id UNIQUE): rebuild the table without the constraint,
+    keeping ids, and add the assignee index. Returns True if a rebuild happened.
+    """
+    conn = sqlite3.connect("./database.db")
+    try:
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='tickets'").fetchone()
+        rebuilt = bool(row and "UNIQUE" in row[0].upper())
+        if rebuilt:
+            conn.executescript(
+                "PRAGMA foreign_keys = OFF;"
+                "BEGIN;"
+                + TICKETS_DDL.format(name="tickets_new") + ";"
+                "INSERT INTO tickets_new (id, title, assignee_id, status) SELECT id, title, assignee_id, status FROM tickets;"
+                "DROP TABLE tickets;"
+                "ALTER TABLE tickets_new RENAME TO tickets;"
+                "COMMIT;"
+                "PRAGMA foreign_keys = ON;"
+            )
+        if row:
+            conn.execute(TICKETS_INDEX_DDL)
+            conn.commit()
+        return rebuilt
+    finally:
+        conn.close()
+
 def show_users() -> list[dict]:
-    rows = conn.execute("SELECT * FROM users").fetchall()
+    with get_conn() as conn, phase("sqlite"):
+        rows = conn.execute("SELECT * FROM users").fetchall()
     return [{"user_id": r["id"], "name": r["name"]} for r in rows]
 
 def add_user(user_id: int, name: str) -> str:
@@ -86,58 +139,40 @@ def create_ticket(title: str, assignee_name: str) -> str:
         conn.commit()
         return f"Ticket created with id {ticket_id}."
 
-def view_ticket_title(user_id: int) -> str:
-    with get_conn() as conn:
-        row = conn.execute("SELECT title FROM tickets WHERE assignee_id = ?", (user_id,)).fetchone()
-        if not row:
-            return f"Ticket with user id {user_id} does not exist."
-        return row["title"]
+def get_ticket(ticket_id: int) -> Optional[Ticket]:
+    query, params = _tickets_query("ALL", ticket_id=ticket_id)
+    with get_conn() as conn, phase("sqlite"):
+        return _ticket_cursor(conn).execute(query, params).fetchone()
 
-def update_ticket_status(user_id: int, status: str) -> str:
-    status = status.upper()
+def view_ticket_title(ticket_id: int) -> str:
+    ticket = get_ticket(ticket_id)
+    if ticket is None:
+        return f"Ticket with id {ticket_id} does not exist."
+    return ticket.title
+
+def update_ticket_status(ticket_id: int, status: str) -> str:
+    status = status.upper().replace("-", "_")
     if status not in {"OPEN", "IN_PROGRESS", "CLOSED"}:
         return "Invalid status. Use OPEN, IN_PROGRESS, or CLOSED."
     with get_conn() as conn:
-        cur = conn.execute("UPDATE tickets SET status = ? WHERE assignee_id = ?", (status, user_id))
+        cur = conn.execute("UPDATE tickets SET status = ? WHERE id = ?", (status, ticket_id))
         if cur.rowcount == 0:
-            return f"Ticket with id {user_id} does not exist."
+            return f"Ticket with id {ticket_id} does not exist."
         conn.commit()
-        return f"Ticket with id {user_id} status updated to {status}."
+        return f"Ticket with id {ticket_id} status updated to {status}."
 
-def delete_ticket(user_id: int) -> str:
+def delete_ticket(ticket_id: int) -> str:
     with get_conn() as conn:
         try:
-            cur = conn.execute("DELETE FROM tickets WHERE assignee_id = ?", (user_id,))
+            cur = conn.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
             if cur.rowcount == 0:
-                return f"Ticket with user_id {user_id} does not exist."
+                return f"Ticket with id {ticket_id} does not exist."
             conn.commit()
-            return f"Ticket with user_id {user_id} deleted successfully."
+            return f"Ticket with id {ticket_id} deleted successfully."
         except Exception as e:
-            return f"Error while deleting ticket for user id {user_id}: {e}"
-
-def list_tickets(kind: str = "OPEN") -> str:
-    kind = kind.lower().replace("-", "_")
-    query = "SELECT t.id, t.title, t.assignee_id, u.name AS assignee, t.status FROM tickets t JOIN users u ON t.assignee_id = u.id"
-    params = ()
-    if kind in {"open", "in_progress", "closed"}:
-        query += " WHERE t.status = ?"
-        params = (kind.upper(),)
-    query += " ORDER BY t.id ASC"
-    with get_conn() as conn:
-        rows = conn.execute(query, params).fetchall()
-    if not rows:
-        return "No tickets found."
-    # table format
-    from tabulate import tabulate
-    headers = ["id", "title", "assignee", "status"]
-    table = tabulate([[r["id"], r["title"], r["assignee_id"], r["assignee"], r["status"]] for r in rows], headers=["id","title","assignee_id","assignee","status"], tablefmt="github")
-    return table
+            return f"Error while deleting ticket {ticket_id}: {e}"
 
-def list_tickets_all(kind: str = "OPEN") -> List[Dict[str, Any]]:
-    """
-    FastAPI-friendly: return a JSON-serializable list of tickets.
-    Shape: [{id, title, assignee_id, assignee, status}, ...]
-    """
+def _tickets_query(kind: str, assignee_id: Optional[int] = None, ticket_id: Optional[int] = None):
     kind_norm = (kind or "ALL").upper().replace("-", "_")
 
     query = """
@@ -149,26 +184,40 @@ def list_tickets_all(kind: str = "OPEN") -> List[Dict[str, Any]]:
         FROM tickets t
         JOIN users u ON t.assignee_id = u.id
     """
-    params = ()
+    where, params = [], []
     if kind_norm in {"OPEN", "IN_PROGRESS", "CLOSED"}:
-        query += " WHERE t.status = ?"
-        params = (kind_norm,)
+        where.append("t.status = ?")
+        params.append(kind_norm)
+    if assignee_id is not None:
+        where.append("t.assignee_id = ?")
+        params.append(assignee_id)
+    if ticket_id is not None:
+        where.append("t.id = ?")
+        params.append(ticket_id)
+    if where:
+        query += " WHERE " + " AND ".join(where)
     query += " ORDER BY t.id ASC"
+    return query, tuple(params)
 
-    with get_conn() as conn:
-        rows = conn.execute(query, params).fetchall()
+def list_tickets(kind: str = "OPEN", assignee_id: Optional[int] = None) -> str:
+    rows = list_tickets_all(kind, assignee_id)
+    if not rows:
+        return "No tickets found."
+    # table format
+    from tabulate import tabulate
+    with phase("tabulate"):
+        table = tabulate(rows, headers=TICKET_COLUMNS, tablefmt="github")
+    return table
 
-    # Ensure a list of dicts even if empty
-    return [
-        {
-            "id": r["id"],
-            "title": r["title"],
-            "assignee_id": r["assignee_id"],
-            "assignee": r["assignee"],
-            "status": r["status"],
-        }
-        for r in rows
-    ]
+def list_tickets_all(kind: str = "OPEN", assignee_id: Optional[int] = None) -> List[Ticket]:
+    """
+    Return tickets as Ticket rows (id, title, assignee_id, assignee, status),
+    optionally filtered by status kind and/or assignee.
+    Serialize with utils.fast_json.encode_tickets, or t._asdict() for a dict.
+    """
+    query, params = _tickets_query(kind, assignee_id)
+    with get_conn() as conn, phase("sqlite"):
+        return _ticket_cursor(conn).execute(query, params).fetchall()
 
 
 def reset_db() -> str:
@@ -186,13 +235,17 @@ def reset_db() -> str:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--init", action="store_true", help="Initialize database")
+    parser.add_argument("--migrate", action="store_true", help="Upgrade an existing database to the current schema")
     args = parser.parse_args()
     if args.init:
         init_db()
+    if args.migrate:
+        print("Tickets table migrated." if migrate_db() else "Database already up to date.")
 else:
     # Auto-init on import if database not exists
     with get_conn() as conn:
         row = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users';").fetchone()
         if not row:
             init_db()
+    migrate_db()
         
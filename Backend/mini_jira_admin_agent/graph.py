@@ -1,43 +1,158 @@
-import json
+import logging, re, threading, time
+from collections import Counter
 from typing import Dict, Any
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.runnables import RunnableLambda
-from .config import get_llm
+from .batching import router_dispatcher
 from .tools import add_user_tool, create_ticket_tool, view_ticket_tool, update_status_tool, list_tickets_tool, reset_database_tool, delete_user_tool, delete_ticket_tool, show_users_tool
 from .nlp_prompts import ROUTER_SYSTEM_PROMPT
+from .admission import llm_gate
+from .router_schema import parse_route, validate_route, RouteError
+from .intent_index import get_intent_index
+from .config import PREROUTE_MIN_CONFIDENCE, PREROUTE_MIN_MARGIN, INTENT_INDEX_LEARN
+from .profiling import phase, record
 
+logger = logging.getLogger("mini_jira")
+
+# Counters for router output quality; a repair costs one extra LLM call, a fallback a wasted one
+_router_stats = Counter()
+_router_stats_lock = threading.Lock()
+
+def _count(key: str) -> None:
+    with _router_stats_lock:
+        _router_stats[key] += 1
+
+def router_stats() -> Dict[str, int]:
+    with _router_stats_lock:
+        return dict(_router_stats)
+
+def _ask_router(query):
+    _count("llm_calls")
+    queued = time.perf_counter()
+    token = llm_gate.acquire_slot()    # bounded concurrency; raises admission.Overloaded when the queue is full
+    record("llm.queue", (time.perf_counter() - queued) * 1000)
+    try:
+        fut = router_dispatcher.submit(query)    # batched over the Ollama endpoint pool
+    except BaseException:
+        llm_gate.release_slot(token)
+        raise
+    # the slot is held until the Ollama call ends, even if wait() times out first,
+    # so a slow model server cannot get more than LLM_MAX_CONCURRENCY calls at once
+    fut.add_done_callback(lambda _: llm_gate.release_slot(token))
+    with phase("llm.ollama"):
+        res = router_dispatcher.wait(fut)
+    return res.content.strip()
+
+# Intents the pre-router may dispatch without the LLM: read-only, and their only
+# argument (ticket kind) can be read off keywords. Anything with ids/names needs the LLM.
+_KIND_WORDS = [("in_progress", re.compile(r"\bin[\s_-]?progress\b")), ("closed", re.compile(r"\bclosed?\b")), ("open", re.compile(r"\bopen\b"))]
+# list_tickets is only dispatched when every word is one of these; a name, possessive,
+# "for"/"assigned to" or number word may be an assignee the LLM has to extract
+_LIST_TICKETS_WORDS = frozenset("""
+    list show display get view see give me all the every each any ticket tickets
+    open closed close in progress which what are is there please current currently now status with
+""".split())
+# show_users is only dispatched when the message names who is being listed ("show all" alone is not enough)
+_USER_WORDS = re.compile(r"\b(users?|team|members?|people|staff|everyone|everybody)\b")
+
+def _preroute(text: str):
+    """Return (route or None, hint intent or None) from the nearest-neighbor index."""
+    intent, confidence, margin = get_intent_index().classify(text)
+    if intent is None or confidence < PREROUTE_MIN_CONFIDENCE or margin < PREROUTE_MIN_MARGIN:
+        _count("preroute_low_confidence")
+        return None, None
+    lowered = text.lower()
+    if intent == "show_users" and _USER_WORDS.search(lowered):
+        return {"intent": "show_users", "args": {}}, intent
+    if intent == "list_tickets" and set(re.findall(r"[a-z0-9']+", lowered)) <= _LIST_TICKETS_WORDS:
+        kinds = [kind for kind, pattern in _KIND_WORDS if pattern.search(lowered)]
+        if len(kinds) <= 1:
+            return {"intent": "list_tickets", "args": {"kind": kinds[0] if kinds else "all"}}, intent
+    return None, intent
 
 def _router_call(state: Dict[str, Any]) -> Dict[str, Any]:
-    llm = get_llm()
     messages = state.get("messages", []) 
+    latest = messages[-1]["content"] if messages and messages[-1]["role"] == "user" else ""
+    _count("routes")
+    with phase("router.preroute"):
+        route, hint = _preroute(latest) if latest else (None, None)
+    if len(messages) > 1:
+        # a follow-up ("show all" after a clarify question) only makes sense with the
+        # history, which the index does not see: the LLM decides, the index only hints
+        route = None
+    if route is not None:
+        _count("prerouted")
+        return {"router": {**route, "source": "index"}}
     sys_prompt = SystemMessage(content=ROUTER_SYSTEM_PROMPT)
     input_messages = [sys_prompt] + [
         HumanMessage(m["content"]) if m["role"]=="user" else AIMessage(m["content"]) for m in messages
     ]
-    # LLM will output a JSON object describing intent/args or unsupported text
-    router_query = input_messages + [HumanMessage("Return ONLY a JSON object for the latest user message.")]
-    res = llm.invoke(router_query)
-    text = res.content.strip()
+    # LLM will output a JSON object describing intent/args (schema-constrained when Ollama supports it)
+    instruction = "Return ONLY a JSON object for the latest user message."
+    if hint is not None:
+        # the index is fairly sure of the intent; the LLM mainly has to extract its args
+        instruction += f' The intent is most likely "{hint}"; use another one only if it clearly does not fit.'
+        _count("hinted")
+    router_query = input_messages + [HumanMessage(instruction)]
+    # a single-turn message routed by the LLM can teach the index once its tool runs
+    learnable = {"utterance": latest, "source": "llm"} if len(messages) == 1 and latest else {}
+    text = _ask_router(router_query)
     try:
-        data = json.loads(text)
-    except Exception:
+        data = parse_route(text)
+        _count("parsed_clean" if text.startswith("{") and text.endswith("}") else "recovered")
+        return {"router": {**data, **learnable}}
+    except RouteError as e:
+        error = e
+    # one repair round: show the model its output and what was wrong with it
+    repair_query = router_query + [
+        AIMessage(text),
+        HumanMessage(f"That output was invalid: {error} Return ONLY the corrected JSON object."),
+    ]
+    try:
+        data = {**parse_route(_ask_router(repair_query)), **learnable}
+        _count("repaired")
+    except RouteError:
         # unsupported
-        data = {"intent":"unsupported","message":"I can't help with that."}
+        _count("fallbacks")
+        data = {"intent":"unsupported","args":{},"message":"I can't help with that."}
     return {"router": data}
 
+# Learned examples steer later routing, so only read-only intents are learned, and only
+# when the tool found what was asked for ("ticket 9 does not exist" confirms nothing).
+_LEARNABLE_INTENTS = frozenset({"show_users", "list_tickets", "view_ticket"})
+_FAILED_RESULT = re.compile(r"does not exist|^(error|invalid|cannot|please)\b", re.IGNORECASE)
+
+def _confirm_route(router: Dict[str, Any], out: str) -> None:
+    "The tool succeeded, so the LLM's intent for this utterance was right: add it to the index."
+    if not (INTENT_INDEX_LEARN and router.get("source") == "llm" and router.get("utterance")):
+        return
+    if router.get("intent") not in _LEARNABLE_INTENTS or _FAILED_RESULT.search(str(out)):
+        return
+    try:
+        learned = get_intent_index().learn(router["utterance"], router["intent"])
+    except Exception:
+        # learning is best-effort; it must never turn a successful tool call into an error
+        logger.exception("Could not add a routed utterance to the intent index")
+        return
+    if learned:
+        _count("learned")
+
 def _tool_exec(tool, mapping):
     def run(state: Dict[str, Any]) -> Dict[str, Any]:
         args = state["router"].get("args", {})
         tool_args = {key: args.get(key) for key in mapping.keys()}
         try:
-            if tool_args:
-                out = tool.invoke(tool_args)          # tools with params
-            else:
-                out = tool.func()    
+            with phase(f"tool.{tool.name}"):
+                if tool_args:
+                    out = tool.invoke(tool_args)          # tools with params
+                else:
+                    out = tool.func()    
         except Exception as e:
             out = f"Error: {e}"
+        else:
+            _confirm_route(state["router"], out)
         prior = state.get("messages", [])
         return {"messages": prior + [{"role": "assistant", "content": out}]}
     return run
@@ -50,12 +165,12 @@ def build_app():
     sg.add_node("route", RunnableLambda(_router_call))
     sg.add_node("add_user", RunnableLambda(_tool_exec(add_user_tool, {"user_id":None, "name":None})))
     sg.add_node("create_ticket", RunnableLambda(_tool_exec(create_ticket_tool, {"title":None,"assignee_name":None})))
-    sg.add_node("view_ticket", RunnableLambda(_tool_exec(view_ticket_tool, {"user_id": None})))
-    sg.add_node("update_status", RunnableLambda(_tool_exec(update_status_tool, {"user_id": None, "status": None})))
-    sg.add_node("list_tickets", RunnableLambda(_tool_exec(list_tickets_tool, {"kind":None})))
+    sg.add_node("view_ticket", RunnableLambda(_tool_exec(view_ticket_tool, {"ticket_id": None})))
+    sg.add_node("update_status", RunnableLambda(_tool_exec(update_status_tool, {"ticket_id": None, "status": None})))
+    sg.add_node("list_tickets", RunnableLambda(_tool_exec(list_tickets_tool, {"kind":None, "assignee_id":None})))
     sg.add_node("show_users", RunnableLambda(_tool_exec(show_users_tool, {})))
     sg.add_node("delete_user", RunnableLambda(_tool_exec(delete_user_tool, {"user_id": None})))
-    sg.add_node("delete_ticket", RunnableLambda(_tool_exec(delete_ticket_tool, {"user_id": None})))
+    sg.add_node("delete_ticket", RunnableLambda(_tool_exec(delete_ticket_tool, {"ticket_id": None})))
     sg.add_node("reset_database", RunnableLambda(_tool_exec(reset_database_tool, {})))
     sg.add_node("unsupported", RunnableLambda(lambda s: {"messages": s.get("messages", []) + [{"role":"assistant","content": s.get("router", {}).get("message","I can't help with that.")}]}))
     sg.add_node("clarify", RunnableLambda(lambda s: {"messages": s.get("messages", []) + [{"role":"assistant","content": s.get("router", {}).get("message","Could you provide the missing details?")}]}))
@@ -64,7 +179,11 @@ def build_app():
     sg.add_edge(START, "route")
 
     def decide(state: Dict[str, Any]) -> str:
-        intent = state["router"].get("intent")
+        # never dispatch a route that does not match its intent's schema
+        try:
+            intent = validate_route(state["router"])["intent"]
+        except RouteError:
+            return "unsupported"
         return {
             "add_user":"add_user",
             "create_ticket":"create_ticket",
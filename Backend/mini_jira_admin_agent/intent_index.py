@@ -0,0 +1,245 @@
+import hashlib, json, logging, os, re, threading, zlib
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .nlp_prompts import ROUTER_SYSTEM_PROMPT, INTENT_EXAMPLES
+from .config import INTENT_INDEX_PATH, INTENT_INDEX_MAX_LEARNED
+
+try:
+    import fcntl
+except ImportError:    # Windows: saves from several processes are not serialized
+    fcntl = None
+
+logger = logging.getLogger("mini_jira")
+
+DIM = 4096
+FEATURES_VERSION = 1    # bump when _features() changes so saved indexes are rebuilt
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def _features(text: str) -> List[int]:
+    "Hashed word unigrams + char 3/4-grams; digits collapse to 0 so ids don't matter."
+    words = _WORD.findall(re.sub(r"\d+", "0", text.lower()))
+    feats = ["w:" + w for w in words]
+    for w in words:
+        padded = f" {w} "
+        for n in (3, 4):
+            feats.extend("c:" + padded[i:i + n] for i in range(len(padded) - n + 1))
+    return [zlib.crc32(f.encode()) % DIM for f in feats]
+
+
+def embed(texts: List[str]) -> np.ndarray:
+    "L2-normalized float32 bag-of-ngrams vectors, one row per text."
+    out = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        idx = _features(text)
+        if idx:
+            out[row] = np.bincount(idx, minlength=DIM)
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.maximum(norms, 1e-9)
+
+
+def seed_examples() -> List[Tuple[str, str]]:
+    "(utterance, intent) pairs from the router prompt's EXAMPLES plus nlp_prompts.INTENT_EXAMPLES."
+    pairs = []
+    for text, raw in re.findall(r"^User: (.+)\n(\{.*\})$", ROUTER_SYSTEM_PROMPT, flags=re.MULTILINE):
+        intent = json.loads(raw).get("intent")
+        if intent != "clarify":    # clarify depends on missing args, not on wording
+            pairs.append((text.strip(), intent))
+    for intent, texts in INTENT_EXAMPLES.items():
+        pairs.extend((t, intent) for t in texts)
+    return pairs
+
+
+def seed_fingerprint(pairs: List[Tuple[str, str]]) -> str:
+    "Identifies the seed set and embedding settings a saved index was built from."
+    return hashlib.sha1(json.dumps([DIM, FEATURES_VERSION, pairs]).encode()).hexdigest()
+
+
+@contextmanager
+def _file_lock(path: str):
+    "Exclusive lock on <path>.lock across processes (no-op without fcntl)."
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class IntentIndex:
+    """
+    Nearest-neighbor intent classifier over labeled utterances (cosine similarity
+    on hashed n-gram vectors). Persisted as <path>.npy (vectors, opened with
+    mmap so workers start without re-embedding) + <path>.json (labels/texts and
+    a fingerprint of the seeds and embedding settings; a mismatch rebuilds it).
+
+    The first `seeds` examples are the seed set; learned ones follow, at most
+    max_learned of them. Each worker process learns in memory; save() merges its
+    examples into the file under a file lock and picks up the other workers'.
+    """
+
+    def __init__(self, vectors: np.ndarray, labels: List[str], texts: List[str], path: Optional[str] = None,
+                 seeds: Optional[int] = None, fingerprint: Optional[str] = None):
+        self.vectors = vectors
+        self.labels = labels
+        self.texts = texts
+        self.path = path
+        self.seeds = len(labels) if seeds is None else seeds
+        self.fingerprint = fingerprint
+        self.max_learned = INTENT_INDEX_MAX_LEARNED
+        self._buf = vectors    # rows past len(labels) are spare room for learn()
+        self._label_arr = np.array(labels)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()    # one writer at a time, so the newest snapshot is renamed last
+        self._unsaved = 0
+        self.save_every = 20
+
+    @classmethod
+    def build(cls, pairs: List[Tuple[str, str]], path: Optional[str] = None) -> "IntentIndex":
+        texts = [t for t, _ in pairs]
+        return cls(embed(texts), [i for _, i in pairs], texts, path, len(pairs), seed_fingerprint(pairs))
+
+    @classmethod
+    def load(cls, path: str, fingerprint: Optional[str] = None) -> "IntentIndex":
+        "Open a saved index; ValueError if it was built from other seeds/settings than `fingerprint`."
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+            raise ValueError(f"{path} was built from other seed examples or embedding settings")
+        vectors = np.load(path + ".npy", mmap_mode="r")
+        # the two files are replaced one after the other; a save only appends
+        # (see save()), so a reader caught in between just uses the common prefix
+        n = min(len(vectors), len(meta["labels"]))
+        return cls(vectors[:n], meta["labels"][:n], meta["texts"][:n], path, meta["seeds"], meta["fingerprint"])
+
+    @classmethod
+    def open(cls, path: str) -> "IntentIndex":
+        """
+        Load the persisted index at path, or build it from the seed examples and save it
+        (also when the saved one is stale: seeds, DIM or features changed since).
+        If path cannot be written (e.g. a read-only working directory) the index stays in memory.
+        """
+        pairs = seed_examples()
+        try:
+            return cls.load(path, seed_fingerprint(pairs))
+        except (OSError, ValueError, KeyError):
+            index = cls.build(pairs, path)
+            try:
+                index.save()
+            except OSError as e:
+                logger.warning("Cannot write the intent index to %s (%s); keeping it in memory only.", path, e)
+                index.path = None
+            return index
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def classify(self, text: str) -> Tuple[Optional[str], float, float]:
+        """
+        Return (intent, confidence, margin): confidence is the cosine similarity of
+        the nearest example, margin how much closer it is than the nearest example
+        of any other intent.
+        """
+        with self._lock:
+            vectors, labels, label_arr = self.vectors, self.labels, self._label_arr
+        if not labels:
+            return None, 0.0, 0.0
+        sims = np.asarray(vectors @ embed([text])[0])
+        best = int(np.argmax(sims))
+        others = sims[label_arr != labels[best]]
+        runner_up = float(others.max()) if others.size else 0.0
+        return labels[best], float(sims[best]), float(sims[best]) - runner_up
+
+    def learn(self, text: str, intent: str) -> bool:
+        """
+        Add a confirmed (utterance, intent); skips near-duplicates and stops once
+        max_learned examples have been learned. Saves every save_every additions.
+        """
+        text = text.strip()
+        if not text:
+            return False
+        vec = embed([text])
+        with self._lock:
+            n = len(self.labels)
+            if n - self.seeds >= self.max_learned:
+                return False
+            if n:
+                sims = np.asarray(self.vectors @ vec[0])
+                best = int(np.argmax(sims))
+                if sims[best] > 0.97 and self.labels[best] == intent:
+                    return False
+            if n >= len(self._buf) or not self._buf.flags.writeable:
+                # grow geometrically (and out of the read-only mmap) instead of copying on every add
+                buf = np.empty((max(2 * n, 64), DIM), dtype=np.float32)
+                buf[:n] = self.vectors
+                self._buf = buf
+            self._buf[n] = vec[0]    # past the end of self.vectors, so readers' snapshots are untouched
+            self.vectors = self._buf[:n + 1]
+            self.labels = self.labels + [intent]
+            self.texts = self.texts + [text]
+            self._label_arr = np.array(self.labels)
+            self._unsaved += 1
+            save = self.path is not None and self._unsaved >= self.save_every
+        if save:
+            self.save()
+        return True
+
+    def save(self) -> None:
+        "Merge with the saved file (other workers' learned examples) and write it back."
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._save_lock, _file_lock(self.path):
+            with self._lock:
+                vectors, labels, texts = np.array(self.vectors), list(self.labels), list(self.texts)
+                snapshot = len(labels)
+                self._unsaved = 0
+            try:
+                disk = IntentIndex.load(self.path, self.fingerprint)
+            except (OSError, ValueError, KeyError):
+                disk = None
+            if disk is not None:
+                # keep the file's examples first so the new file only appends to the old one
+                known = set(zip(disk.texts, disk.labels))
+                room = max(0, self.max_learned - (len(disk) - disk.seeds))
+                extra = [i for i in range(self.seeds, len(labels)) if (texts[i], labels[i]) not in known][:room]
+                vectors = np.concatenate([np.asarray(disk.vectors), vectors[extra]])
+                texts = disk.texts + [texts[i] for i in extra]
+                labels = disk.labels + [labels[i] for i in extra]
+                with self._lock:
+                    if len(self.labels) == snapshot:    # nothing learned meanwhile: use the merged set
+                        self.vectors = self._buf = vectors
+                        self.labels, self.texts = labels, texts
+                        self._label_arr = np.array(labels)
+            # write-then-rename so a worker mapping the old file never sees a partial one;
+            # the tmp name is unique per process and thread
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            np.save(tmp + ".npy", vectors)
+            with open(tmp + ".json", "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": self.fingerprint, "seeds": self.seeds, "labels": labels, "texts": texts}, f)
+            os.replace(tmp + ".npy", self.path + ".npy")
+            os.replace(tmp + ".json", self.path + ".json")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for label in self.labels:
+                counts[label] = counts.get(label, 0) + 1
+            return {"examples": len(self.labels), "unsaved": self._unsaved, **{f"intent:{k}": v for k, v in sorted(counts.items())}}
+
+
+_index: Optional[IntentIndex] = None
+_index_lock = threading.Lock()
+
+def get_intent_index() -> IntentIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = IntentIndex.open(INTENT_INDEX_PATH)
+        return _index
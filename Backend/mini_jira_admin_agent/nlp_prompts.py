@@ -10,12 +10,12 @@ Keys:
 INTENT → REQUIRED ARGS
 - add_user       → {"user_id": <integer>, "name": <string>}
 - create_ticket  → {"title": <string>, "assignee_name": <string>}
-- view_ticket    → {"user_id": <integer>}
-- update_status  → {"user_id": <integer>, "status": <"OPEN"|"IN_PROGRESS"|"CLOSED">}
-- list_tickets   → {"kind": <"all"|"open"|"in_progress"|"closed">}
+- view_ticket    → {"ticket_id": <integer>}
+- update_status  → {"ticket_id": <integer>, "status": <"OPEN"|"IN_PROGRESS"|"CLOSED">}
+- list_tickets   → {"kind": <"all"|"open"|"in_progress"|"closed">, "assignee_id": <integer, optional>}
 - show_users     → {}   # no arguments required
 - delete_user    → {"user_id": <integer>}
-- delete_ticket  → {"user_id": <integer>}
+- delete_ticket  → {"ticket_id": <integer>}
 - reset_database → {}   # no arguments required
 - clarify        → {"message": <string>}
 - unsupported    → {"message": <string>}
@@ -24,7 +24,8 @@ RULES
 - user_id and ticket_id MUST be integers (e.g., "1" → 1).
 - status: accept variants ("in-progress","in_progress") but normalize to "IN_PROGRESS".
 - kind: if the user just says "list tickets", set {"kind": "all"}.
-- list_users: if the user asks "list users", "show users", "get users", "who is in the system", "list all users", or similar, map to {"intent":"list_users","args":{}}.
+- Tickets are identified by their own ticket_id; a user can have many tickets. "tickets for user 7" → list_tickets with "assignee_id": 7.
+- show_users: if the user asks "list users", "show users", "get users", "who is in the system", "list all users", or similar, map to {"intent":"show_users","args":{}}.
 - reset_database: if the user says "reset database", "clear all data", or similar, map to {"intent":"reset_database","args":{}}.
 - If you cannot confidently extract ALL required args, use:
   {"intent":"clarify","args":{"message":"<ask for the missing pieces here>"}}
@@ -41,11 +42,11 @@ User: add user 1 Alice
 User: create ticket "Login bug" for Alice
 {"intent":"create_ticket","args":{"title":"Login bug","assignee_name":"Alice"}}
 
-User: view ticket for user 7
-{"intent":"view_ticket","args":{"user_id":7}}
+User: view ticket 7
+{"intent":"view_ticket","args":{"ticket_id":7}}
 
-User: set status in-progress for user 7
-{"intent":"update_status","args":{"user_id":7,"status":"IN_PROGRESS"}}
+User: set status in-progress for ticket 7
+{"intent":"update_status","args":{"ticket_id":7,"status":"IN_PROGRESS"}}
 
 User: list tickets
 {"intent":"list_tickets","args":{"kind":"all"}}
@@ -53,14 +54,17 @@ User: list tickets
 User: list open tickets
 {"intent":"list_tickets","args":{"kind":"open"}}
 
+User: show tickets for user 3
+{"intent":"list_tickets","args":{"kind":"all","assignee_id":3}}
+
 User: reset database
 {"intent":"reset_database","args":{}}
 
 User: delete user 5
 {"intent":"delete_user","args":{"user_id":5}}
 
-User: delete ticket for user 12
-{"intent":"delete_ticket","args":{"user_id":12}}
+User: delete ticket 12
+{"intent":"delete_ticket","args":{"ticket_id":12}}
 
 User: add user Alice
 {"intent":"clarify","args":{"message":"Please provide both user_id (integer) and name, e.g., 'add user 1 Alice'."}}
@@ -68,5 +72,26 @@ User: add user Alice
 User: tell me a joke
 {"intent":"unsupported","args":{"message":"Please provide a valid request, e.g., 'add user 1 Alice', 'create ticket Login bug for Alice', 'list users', etc."}}
 
-If you're replying apart from intent just add "-- Repiled by LLAMA" at the end.
+Never add any text before or after the JSON object.
 """
+
+# Extra labeled utterances for the nearest-neighbor pre-router (intent_index.py),
+# on top of the "User: ... / {json}" examples parsed from ROUTER_SYSTEM_PROMPT.
+INTENT_EXAMPLES = {
+    "show_users": [
+        "list users", "get users", "list all users", "who is in the system", "who's on the team?",
+        "show me the team", "which users exist", "display all users", "show team members",
+    ],
+    "list_tickets": [
+        "show tickets", "list all tickets", "show me the open tickets", "which tickets are closed",
+        "list tickets in progress", "display every ticket", "what tickets are there", "list closed tickets",
+    ],
+    "add_user": ["create user 3 Bob", "add a new user named Carol with id 4", "register user 9 Dave"],
+    "create_ticket": ["open a ticket titled Crash on save for Bob", "new ticket Payment fails assigned to Carol"],
+    "view_ticket": ["what is the title of ticket 3", "show ticket 12", "view the title of ticket with id 1"],
+    "update_status": ["close ticket 4", "mark ticket 2 as in progress", "reopen ticket 9", "change status of ticket 5 to closed"],
+    "delete_user": ["remove user 3", "delete the user with id 8"],
+    "delete_ticket": ["remove ticket 4", "delete the ticket with id 2"],
+    "reset_database": ["clear all data", "wipe the database", "delete everything"],
+    "unsupported": ["what's the weather today", "write me a poem", "who won the game last night"],
+}
@@ -0,0 +1,164 @@
+import os, sys, threading, time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# -------- Per-request phase timing --------
+# The server opens a recorder per request (recording()); phase() blocks anywhere below it
+# (graph nodes, tools, db) append (name, ms). Without a recorder phase() is a no-op.
+_recorder: ContextVar[Optional[list]] = ContextVar("phase_recorder", default=None)
+
+
+@contextmanager
+def recording():
+    "Collect phases for this block (and contexts copied from it), then restore the previous recorder."
+    phases: list = []
+    token = _recorder.set(phases)
+    try:
+        yield phases
+    finally:
+        _recorder.reset(token)
+
+
+def record(name: str, ms: float) -> None:
+    phases = _recorder.get()
+    if phases is not None:
+        phases.append((name, round(ms, 3)))
+
+
+@contextmanager
+def phase(name: str):
+    phases = _recorder.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases.append((name, round((time.perf_counter() - start) * 1000, 3)))
+
+
+def summarize(phases: list) -> Dict[str, Dict[str, float]]:
+    "Total ms and count per phase name (phases can nest, so totals may overlap)."
+    out: Dict[str, Dict[str, float]] = {}
+    for name, ms in phases:
+        entry = out.setdefault(name, {"ms": 0.0, "count": 0})
+        entry["ms"] = round(entry["ms"] + ms, 3)
+        entry["count"] += 1
+    return out
+
+
+class SlowRequestLog:
+    """Bounded ring buffer of requests slower than threshold_ms, with their phase breakdown."""
+
+    def __init__(self, threshold_ms: float, size: int):
+        self.threshold_ms = threshold_ms
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.captured = 0
+
+    def maybe_capture(self, method: str, path: str, status: int, total_ms: float, phases: list) -> bool:
+        if total_ms < self.threshold_ms:
+            return False
+        entry = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime()),
+            "method": method,
+            "path": path,
+            "status": status,
+            "total_ms": round(total_ms, 3),
+            "phases": summarize(phases),
+            "timeline": phases,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.captured += 1
+        return True
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self._entries))    # newest first
+
+
+# -------- Sampling profiler --------
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads every interval for a fixed duration from a
+    background thread (no tracing hooks, so overhead is one stack walk per sample).
+    Output is collapsed stacks ("thread;file:func;file:func count"), the input
+    format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self.interval = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = 0.01) -> bool:
+        "Start a new run (clears the previous one); False if one is already running."
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self.duration = seconds
+            self.interval = interval
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        deadline = time.monotonic() + self.duration
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            sampled = []
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                sampled.append(";".join(reversed(stack)))
+            with self._lock:
+                self._stacks.update(sampled)
+                self.samples += 1
+            self._stop.wait(self.interval)
+
+    def collapsed(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "started_at": self.started_at,
+                "duration_s": self.duration,
+                "interval_ms": round(self.interval * 1000, 3),
+                "samples": self.samples,
+                "unique_stacks": len(self._stacks),
+            }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,143 @@
+import json
+from typing import Any, Dict, Literal, Optional, Type
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+
+# -------- Per-intent argument schemas --------
+class _Args(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+class NoArgs(_Args):
+    pass
+
+class AddUserArgs(_Args):
+    user_id: int
+    name: str
+
+class CreateTicketArgs(_Args):
+    title: str
+    assignee_name: str
+
+class TicketIdArgs(_Args):
+    ticket_id: int
+
+class UserIdArgs(_Args):
+    user_id: int
+
+class UpdateStatusArgs(_Args):
+    ticket_id: int
+    status: Literal["OPEN", "IN_PROGRESS", "CLOSED"]
+
+    @field_validator("status", mode="before")
+    @classmethod
+    def _norm_status(cls, v):
+        return v.strip().upper().replace("-", "_").replace(" ", "_") if isinstance(v, str) else v
+
+class ListTicketsArgs(_Args):
+    kind: Literal["all", "open", "in_progress", "closed"] = "all"
+    assignee_id: Optional[int] = None
+
+    @field_validator("kind", mode="before")
+    @classmethod
+    def _norm_kind(cls, v):
+        if v is None:
+            return "all"
+        return v.strip().lower().replace("-", "_").replace(" ", "_") if isinstance(v, str) else v
+
+class MessageArgs(_Args):
+    message: str
+
+
+INTENT_ARGS: Dict[str, Type[_Args]] = {
+    "add_user": AddUserArgs,
+    "create_ticket": CreateTicketArgs,
+    "view_ticket": TicketIdArgs,
+    "update_status": UpdateStatusArgs,
+    "list_tickets": ListTicketsArgs,
+    "show_users": NoArgs,
+    "delete_user": UserIdArgs,
+    "delete_ticket": TicketIdArgs,
+    "reset_database": NoArgs,
+    "clarify": MessageArgs,
+    "unsupported": MessageArgs,
+}
+
+# names the model sometimes produces for an existing intent
+INTENT_ALIASES = {"list_users": "show_users", "get_users": "show_users"}
+
+
+def _intent_schema(intent: str, model: Type[_Args]) -> Dict[str, Any]:
+    args = model.model_json_schema()
+    args.pop("title", None)
+    return {
+        "type": "object",
+        "properties": {"intent": {"type": "string", "enum": [intent]}, "args": args},
+        "required": ["intent", "args"],
+    }
+
+# JSON schema for Ollama's `format` (grammar-constrained output)
+ROUTER_JSON_SCHEMA: Dict[str, Any] = {"anyOf": [_intent_schema(i, m) for i, m in INTENT_ARGS.items()]}
+
+
+# -------- Parsing / validation --------
+class RouteError(ValueError):
+    """Router output that is not a usable route; str(e) is fed back to the model for repair."""
+
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """Return the first JSON object in text (tolerates prose, code fences, trailing sign-offs)."""
+    text = (text or "").strip()
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data
+    except ValueError:
+        pass
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            data, _ = decoder.raw_decode(text, start)
+            if isinstance(data, dict):
+                return data
+        except ValueError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+
+def validate_route(data: Any) -> Dict[str, Any]:
+    """
+    Check router output against the schema of its intent and normalize it to
+    {"intent": ..., "args": {...}} (+ "message" for clarify/unsupported, which
+    the model may put either at the top level or inside args).
+    """
+    if not isinstance(data, dict):
+        raise RouteError("Output is not a JSON object.")
+    intent = data.get("intent")
+    intent = INTENT_ALIASES.get(intent, intent)
+    if intent not in INTENT_ARGS:
+        raise RouteError(f"Unknown intent {intent!r}; use one of {sorted(INTENT_ARGS)}.")
+    args = data.get("args") or {}
+    if not isinstance(args, dict):
+        raise RouteError('"args" must be an object.')
+    if intent in ("clarify", "unsupported") and "message" not in args and isinstance(data.get("message"), str):
+        args = {**args, "message": data["message"]}
+    try:
+        parsed = INTENT_ARGS[intent].model_validate(args)
+    except ValidationError as e:
+        problems = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'args'}: {err['msg']}" for err in e.errors())
+        raise RouteError(f"Invalid args for {intent}: {problems}.") from None
+    route = {"intent": intent, "args": parsed.model_dump(exclude_none=True)}
+    if isinstance(parsed, MessageArgs):
+        route["message"] = parsed.message
+    return route
+
+
+def parse_route(text: str) -> Dict[str, Any]:
+    """extract_json + validate_route; raises RouteError."""
+    data = extract_json(text)
+    if data is None:
+        raise RouteError("No JSON object found in the output.")
+    return validate_route(data)
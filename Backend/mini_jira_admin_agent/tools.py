@@ -19,19 +19,19 @@ def create_ticket_tool(title: str, assignee_name: str) -> str:
     return db.create_ticket(title, assignee_name)
 
 @tool("view_ticket", return_direct=True)
-def view_ticket_tool(user_id: int) -> str:
-    """View a ticket title by user_id, or not-found message."""
-    return db.view_ticket_title(user_id)
+def view_ticket_tool(ticket_id: int) -> str:
+    """View a ticket title by ticket_id, or not-found message."""
+    return db.view_ticket_title(ticket_id)
 
 @tool("update_status", return_direct=True)
-def update_status_tool(user_id: int, status: str) -> str:
-    """Update ticket status to OPEN | IN_PROGRESS | CLOSED."""
-    return db.update_ticket_status(user_id, status)
+def update_status_tool(ticket_id: int, status: str) -> str:
+    """Update the status of ticket ticket_id to OPEN | IN_PROGRESS | CLOSED."""
+    return db.update_ticket_status(ticket_id, status)
 
 @tool("list_tickets", return_direct=True)
-def list_tickets_tool(kind: str = "all") -> str:
-    """List tickets as a table. kind = all | OPEN | IN_PROGRESS | CLOSED."""
-    return db.list_tickets(kind)
+def list_tickets_tool(kind: str | None = "all", assignee_id: int | None = None) -> str:
+    """List tickets as a table. kind = all | OPEN | IN_PROGRESS | CLOSED; optionally only those of user assignee_id."""
+    return db.list_tickets(kind or "all", assignee_id)
 
 @tool("reset_database", return_direct=True)
 def reset_database_tool() -> str:
@@ -44,9 +44,9 @@ def delete_user_tool(user_id: int) -> str:
     return db.delete_user(user_id)
 
 @tool("delete_ticket", return_direct=True)
-def delete_ticket_tool(user_id: int) -> str:
-    """Delete a ticket by user_id."""
-    return db.delete_ticket(user_id)
+def delete_ticket_tool(ticket_id: int) -> str:
+    """Delete a ticket by ticket_id."""
+    return db.delete_ticket(ticket_id)
 
 @tool("show_users", return_direct=True)
 def show_users_tool() -> str:
@@ -1,12 +1,23 @@
 # server.py
+import asyncio, contextvars, hmac, time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from uuid import uuid4
 from collections import defaultdict
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request, Response, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Literal
-from mini_jira_admin_agent import tools, db
-from mini_jira_admin_agent.graph import build_app as run_langgraph  # your LangGraph router
+from typing import Literal, Optional
+from mini_jira_admin_agent import db
+from mini_jira_admin_agent.admission import llm_gate, chat_limiter, Overloaded
+from mini_jira_admin_agent.batching import router_dispatcher
+from mini_jira_admin_agent.intent_index import get_intent_index
+from mini_jira_admin_agent.profiling import SlowRequestLog, profiler, phase, recording
+from mini_jira_admin_agent.config import ADMIN_TOKEN, SLOW_REQUEST_MS, SLOW_REQUEST_BUFFER, PROFILE_MAX_SECONDS
+from mini_jira_admin_agent.graph import build_app as run_langgraph, router_stats  # your LangGraph router
+from utils.single_flight import SingleFlight
+from utils import fast_json
 import logging, traceback
 logger = logging.getLogger("mini_jira")
 
@@ -15,6 +26,89 @@ app = FastAPI(title="Mini-Jira Admin Agent API", version="1.0")
 
 # Build the LangGraph app once at startup
 lang_app = run_langgraph()
+get_intent_index()    # map (or build once) the pre-router's example index
+
+# Concurrent identical reads (e.g. many dashboards refreshing at once) share one
+# DB query and one serialized body. Writes run inside _write() so a read that
+# starts after a write never joins a flight that started before (or during) it.
+_reads = SingleFlight()
+
+@contextmanager
+def _write():
+    _reads.forget()
+    try:
+        yield
+    finally:
+        _reads.forget()
+
+def _shared_json(key, build, accept_encoding: Optional[str] = None) -> Response:
+    """
+    build() returns the serialized JSON bytes. Compressed variants are coalesced
+    separately per encoding but reuse the same shared uncompressed body.
+    """
+    enc = fast_json.negotiate(accept_encoding)
+    with phase("read.shared"):    # the leader's sqlite/serialize time, or a follower's wait
+        if enc is None:
+            body, used = _reads.do(key, build), None
+        else:
+            # the inner flight is not counted: one HTTP request is one leader or one follower
+            body, used = _reads.do(key + (enc,), lambda: fast_json.compress(_reads.do(key, build, count=False), enc))
+    headers = {"Vary": "Accept-Encoding"}
+    if used:
+        headers["Content-Encoding"] = used
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Chat turns block on Ollama, so they run on their own pool sized to the admission
+# capacity; DB-only routes keep FastAPI's default threadpool and never queue behind them.
+_chat_pool = ThreadPoolExecutor(max_workers=llm_gate.capacity, thread_name_prefix="chat")
+
+def _too_many(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, round(retry_after)))})
+
+# Per-request phase timings; requests slower than SLOW_REQUEST_MS keep theirs in a ring buffer
+slow_requests = SlowRequestLog(SLOW_REQUEST_MS, SLOW_REQUEST_BUFFER)
+
+class SlowRequestMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware: that runs the endpoint in a separate
+    task and buffers the response). Records phases for /api/ requests and times them
+    until the last body chunk has been sent.
+    """
+
+    def __init__(self, app, log: SlowRequestLog):
+        self.app = app
+        self.log = log
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith("/api/") or path.startswith("/api/admin/"):
+            await self.app(scope, receive, send)
+            return
+        status = 500    # what the server answers if the app raises before responding
+        started = time.perf_counter()
+        captured = False
+
+        def capture():
+            nonlocal captured
+            captured = True
+            self.log.maybe_capture(scope["method"], path, status, (time.perf_counter() - started) * 1000, phases)
+
+        async def timed_send(message):
+            nonlocal status
+            await send(message)
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                capture()
+
+        with recording() as phases:
+            try:
+                await self.app(scope, receive, timed_send)
+            finally:
+                if not captured:    # unhandled exception or client gone before the last chunk
+                    capture()
+
+app.add_middleware(SlowRequestMiddleware, log=slow_requests)
 
 # Allow frontend (Vite dev server) to call this API
 app.add_middleware(
@@ -63,12 +157,35 @@ class StatusIn(BaseModel):
 #     except Exception as e:
 #         raise HTTPException(status_code=500, detail=f"Chat error: {e}")
 
+def _chat_done(_fut) -> None:
+    llm_gate.release()
+    _reads.forget()
+
 @app.post("/api/chat")
-def chat(inp: ChatIn):
+async def chat(inp: ChatIn, request: Request):
+    client = request.client.host if request.client else "unknown"
+    wait = chat_limiter.check(client)
+    if wait:
+        raise _too_many("Too many chat requests, slow down.", wait)
     try:
-        result = lang_app.invoke({"messages": [{"role": "user", "content": inp.message}]})
+        llm_gate.reserve()
+        _reads.forget()    # chat commands can write to the DB; _chat_done forgets again after
+        # executor futures don't carry contextvars; copy them so phase timings reach the graph
+        ctx = contextvars.copy_context()
+        try:
+            fut = _chat_pool.submit(ctx.run, lang_app.invoke, {"messages": [{"role": "user", "content": inp.message}]})
+        except BaseException:
+            llm_gate.release()
+            raise
+        # release when the graph finishes, not when this coroutine does: a client
+        # disconnect cancels the await but not a turn already running on the pool
+        fut.add_done_callback(_chat_done)
+        with phase("chat.graph"):
+            result = await asyncio.wrap_future(fut)
         reply = result["messages"][-1]["content"]
         return {"reply": reply}
+    except Overloaded as e:
+        raise _too_many(str(e), e.retry_after)
     except Exception as e:
         tb = traceback.format_exc()
         logger.error("Chat failed: %s\n%s", e, tb)
@@ -80,9 +197,9 @@ def chat(inp: ChatIn):
 
 # ---- Users ----
 @app.get("/api/users")
-def list_users():
+def list_users(accept_encoding: Optional[str] = Header(None)):
     try:
-        return {"users": db.show_users()}
+        return _shared_json(("users",), lambda: fast_json.dumps({"users": db.show_users()}), accept_encoding)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"List users failed: {e}")
 
@@ -90,7 +207,8 @@ def list_users():
 def add_user(u: NewUser):
     """Add a new user directly by ID + Name."""
     try:
-        db.add_user(u.user_id, u.name)
+        with _write():
+            db.add_user(u.user_id, u.name)
         return {"ok": True}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Add user failed: {e}")
@@ -99,17 +217,22 @@ def add_user(u: NewUser):
 def delete_user(user_id: int):
     """Delete a user by ID."""
     try:
-        db.delete_user(user_id)
+        with _write():
+            db.delete_user(user_id)
         return {"ok": True}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Delete user failed: {e}")
 
 # ---- Tickets ----
 @app.get("/api/tickets")
-def list_tickets(status: str = "OPEN"):
-    """List tickets, optionally filtered by status."""
+def list_tickets(status: str = "OPEN", assignee_id: Optional[int] = None, accept_encoding: Optional[str] = Header(None)):
+    """List tickets, optionally filtered by status and/or assignee."""
     try:
-        return {"tickets": db.list_tickets_all(status)}
+        return _shared_json(
+            ("tickets", status.upper(), assignee_id),
+            lambda: fast_json.encode_tickets(db.list_tickets_all(status, assignee_id)),
+            accept_encoding,
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"List tickets failed: {e}")
 
@@ -117,7 +240,8 @@ def list_tickets(status: str = "OPEN"):
 def create_ticket(t: NewTicket):
     """Create a new ticket directly for a given assignee."""
     try:
-        db.create_ticket(t.title, t.assignee)
+        with _write():
+            db.create_ticket(t.title, t.assignee)
         return {"ok": True}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Create ticket failed: {e}")
@@ -126,26 +250,87 @@ def create_ticket(t: NewTicket):
 def update_ticket_status(tid: int, s: StatusIn):
     """Update status of a ticket by ID."""
     try:
-        db.update_ticket_status(tid, s.status)
-        return {"ok": True}
+        with _write():
+            msg = db.update_ticket_status(tid, s.status)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Update status failed: {e}")
+    if "does not exist" in msg:
+        raise HTTPException(status_code=404, detail=msg)
+    return {"ok": True}
 
 @app.delete("/api/tickets/{tid}")
 def delete_ticket(tid: int):
     """Delete a ticket by ID."""
     try:
-        tools.delete_ticket(tid)
-        return {"ok": True}
+        with _write():
+            msg = db.delete_ticket(tid)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Delete ticket failed: {e}")
+    if "does not exist" in msg:
+        raise HTTPException(status_code=404, detail=msg)
+    return {"ok": True}
 
 # ---- Reset ----
 @app.post("/api/reset")
 def reset_db():
     """Clear all entries (users + tickets)."""
     try:
-        db.reset_db()
+        with _write():
+            db.reset_db()
         return {"ok": True}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Reset failed: {e}")
+
+# ---- Metrics ----
+@app.get("/api/metrics/coalescing")
+def coalescing_metrics():
+    """Leader vs. coalesced counts for the shared read endpoints."""
+    return _reads.stats()
+
+@app.get("/api/metrics/admission")
+def admission_metrics():
+    """LLM queue depth, queue-time percentiles and load-shedding counts for /api/chat."""
+    return {**llm_gate.stats(), "rate_limited": chat_limiter.limited}
+
+@app.get("/api/metrics/router")
+def router_metrics():
+    """Pre-routing and output quality counters, intent index size, batch sizes and Ollama pool load/health."""
+    return {"outputs": router_stats(), "intent_index": get_intent_index().stats(), **router_dispatcher.stats()}
+
+# =========================================================
+# 3️⃣ Admin: profiling (needs X-Admin-Token == ADMIN_TOKEN)
+# =========================================================
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (set ADMIN_TOKEN).")
+    # header values arrive latin-1 decoded; re-encoding gives the raw bytes the client sent
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode("latin-1"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+@app.post("/api/admin/profile", dependencies=[Depends(require_admin)])
+def start_profile(seconds: float = 10, interval_ms: float = 10):
+    """Sample all thread stacks every interval_ms for the next `seconds`."""
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}].")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be in [1, 1000].")
+    if not profiler.start(seconds, interval_ms / 1000):
+        raise HTTPException(status_code=409, detail="A profile is already running.")
+    return profiler.status()
+
+@app.get("/api/admin/profile", dependencies=[Depends(require_admin)])
+def profile_status():
+    return profiler.status()
+
+@app.get("/api/admin/profile/collapsed", dependencies=[Depends(require_admin)])
+def profile_collapsed():
+    """Collapsed stacks of the last profile, for flamegraph.pl or speedscope."""
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed.txt"'},
+    )
+
+@app.get("/api/admin/slow-requests", dependencies=[Depends(require_admin)])
+def list_slow_requests():
+    """Requests slower than SLOW_REQUEST_MS, newest first, with per-phase timings."""
+    return {"threshold_ms": slow_requests.threshold_ms, "captured": slow_requests.captured, "requests": slow_requests.entries()}
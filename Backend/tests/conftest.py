@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# make `mini_jira_admin_agent` and `utils` importable regardless of where pytest is launched
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from mini_jira_admin_agent.admission import AdmissionGate, Overloaded, RateLimiter
+
+
+def test_slot_bounds_concurrency_and_sheds_when_queue_full():
+    gate = AdmissionGate(max_concurrent=1, max_queue=1, queue_timeout=2)
+    release = threading.Event()
+    peak = []
+
+    def call():
+        with gate.slot():
+            peak.append(gate.stats()["running"])
+            release.wait(2)
+
+    running = threading.Thread(target=call)
+    running.start()
+    while gate.stats()["running"] == 0:
+        time.sleep(0.01)
+    queued = threading.Thread(target=call)
+    queued.start()
+    while gate.stats()["waiting"] == 0:
+        time.sleep(0.01)
+
+    with pytest.raises(Overloaded) as exc:
+        with gate.slot():
+            pass
+    assert exc.value.retry_after >= 1
+
+    release.set()
+    running.join()
+    queued.join()
+    stats = gate.stats()
+    assert peak == [1, 1]
+    assert stats["completed"] == 2 and stats["shed"] == 1
+    assert stats["queue_ms_max"] > 0
+
+
+def test_slot_times_out_while_queued():
+    gate = AdmissionGate(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    with gate.slot():
+        with pytest.raises(Overloaded):
+            with gate.slot():
+                pass
+    assert gate.stats()["timeouts"] == 1
+
+
+def test_admit_fails_fast_beyond_capacity():
+    gate = AdmissionGate(max_concurrent=1, max_queue=1, queue_timeout=1)
+    with gate.admit(), gate.admit():
+        with pytest.raises(Overloaded):
+            with gate.admit():
+                pass
+    with gate.admit():
+        assert gate.stats()["admitted"] == 1
+
+
+def test_rate_limiter_is_per_client():
+    limiter = RateLimiter(rate_per_min=60, burst=2)
+    assert limiter.check("a") == 0 and limiter.check("a") == 0
+    assert 0 < limiter.check("a") <= 1
+    assert limiter.check("b") == 0
+    assert RateLimiter(rate_per_min=0, burst=1).check("a") == 0
+
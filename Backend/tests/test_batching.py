@@ -0,0 +1,178 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from mini_jira_admin_agent.batching import BatchDispatcher
+from mini_jira_admin_agent.config import ModelPool
+
+
+class StandIn:
+    """Minimal local Ollama stand-in: GET /api/tags and POST /api/chat echoing the last message."""
+
+    def __init__(self, delay=0.2, healthy=True):
+        self.delay = delay
+        self.healthy = healthy
+        self.chats = 0
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, body, content_type="application/json"):
+                data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if outer.healthy:
+                    self._json(200, {"models": [{"name": "llama3"}]})
+                else:
+                    self._json(503, {"error": "down"})
+
+            def do_POST(self):
+                req = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if not outer.healthy:
+                    return self._json(500, {"error": "down"})
+                with outer._lock:
+                    outer.chats += 1
+                    outer._active += 1
+                    outer.max_concurrent = max(outer.max_concurrent, outer._active)
+                time.sleep(outer.delay)
+                with outer._lock:
+                    outer._active -= 1
+                chunk = {
+                    "model": req["model"],
+                    "created_at": "2026-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": "echo: " + req["messages"][-1]["content"]},
+                    "done": True,
+                    "done_reason": "stop",
+                }
+                self._json(200, json.dumps(chunk) + "\n", "application/x-ndjson")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_ins():
+    servers = [StandIn(), StandIn()]
+    yield servers
+    for s in servers:
+        s.close()
+
+
+def test_concurrent_prompts_are_batched_across_the_pool(stand_ins):
+    pool = ModelPool([s.url for s in stand_ins], health_interval=0)
+    dispatcher = BatchDispatcher(pool, window_ms=100, max_batch=8)
+
+    futures = [dispatcher.submit([HumanMessage(f"prompt {i}")]) for i in range(6)]
+    replies = [f.result(timeout=10).content for f in futures]
+
+    assert replies == [f"echo: prompt {i}" for i in range(6)]
+    stats = dispatcher.stats()
+    assert stats["batches"] == 1 and stats["largest_batch"] == 6
+    assert [s.chats for s in stand_ins] == [3, 3]      # least-loaded spread
+    assert all(s.max_concurrent > 1 for s in stand_ins)  # each endpoint ran its share concurrently
+
+
+def test_unhealthy_endpoint_is_skipped_and_failures_retried(stand_ins):
+    good, bad = stand_ins
+    bad.healthy = False
+    pool = ModelPool([bad.url, good.url], health_interval=0)
+    dispatcher = BatchDispatcher(pool, window_ms=20, max_batch=4)
+
+    # first call may land on the bad endpoint; it is retried on the good one
+    assert dispatcher.invoke([HumanMessage("a")]).content == "echo: a"
+    assert dispatcher.invoke([HumanMessage("b")]).content == "echo: b"
+    assert pool.stats()[0]["healthy"] is False
+
+    pool.check_all()
+    assert [e["healthy"] for e in pool.stats()] == [False, True]
+    bad.healthy = True
+    pool.check_all()
+    assert [e["healthy"] for e in pool.stats()] == [True, True]
+
+
+class _FlakyPool:
+    "pick() fails the first time; afterwards hands out one fake endpoint."
+
+    def __init__(self, llm):
+        self.endpoints = [type("Ep", (), {"llm": llm})()]
+        self.picks = 0
+
+    def pick(self):
+        self.picks += 1
+        if self.picks == 1:
+            raise RuntimeError("no endpoint")
+        return self.endpoints[0]
+
+    def release(self, ep, ok=True):
+        pass
+
+    def unpick(self, ep):
+        pass
+
+
+def test_dispatch_errors_fail_the_batch_without_killing_the_worker():
+    llm = type("LLM", (), {"batch": lambda self, prompts, return_exceptions: ["ok"] * len(prompts)})()
+    dispatcher = BatchDispatcher(_FlakyPool(llm), window_ms=1, max_batch=1)
+
+    with pytest.raises(RuntimeError, match="no endpoint"):
+        dispatcher.submit([HumanMessage("a")]).result(timeout=5)
+    assert dispatcher.submit([HumanMessage("b")]).result(timeout=5) == "ok"
+
+
+def test_timed_out_router_call_keeps_its_slot_until_ollama_answers(monkeypatch):
+    from mini_jira_admin_agent import graph
+    from mini_jira_admin_agent.admission import AdmissionGate, Overloaded
+
+    hang = threading.Event()
+    llm = type("LLM", (), {"batch": lambda self, prompts, return_exceptions: hang.wait(5) and ["late"] * len(prompts)})()
+    dispatcher = BatchDispatcher(_FlakyPool(llm), window_ms=1, max_batch=1, timeout=0.2)
+    dispatcher.submit([HumanMessage("warm-up")])    # takes the failing first pick
+    gate = AdmissionGate(max_concurrent=1, max_queue=0, queue_timeout=0.1)
+    monkeypatch.setattr(graph, "router_dispatcher", dispatcher)
+    monkeypatch.setattr(graph, "llm_gate", gate)
+
+    with pytest.raises(Overloaded, match="router model"):
+        graph._ask_router([HumanMessage("a")])
+    assert dispatcher.orphaned == 1
+    assert gate.stats()["running"] == 1    # the call is still running on a sender thread
+    with pytest.raises(Overloaded):
+        graph._ask_router([HumanMessage("b")])
+
+    hang.set()
+    deadline = time.monotonic() + 5
+    while gate.stats()["running"]:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_empty_pool_is_rejected():
+    with pytest.raises(ValueError):
+        ModelPool([])
+
+
+def test_failed_endpoint_is_retried_when_health_checks_are_off():
+    pool = ModelPool(["http://a", "http://b"], make_llm=lambda url: None, health_interval=0, retry_unhealthy=0.1)
+    a, b = pool.endpoints
+    pool.release(pool.pick(), ok=False)    # round-robin starts at a
+    assert [pool.pick() for _ in range(3)] == [b, b, b]
+    time.sleep(0.15)
+    assert pool.pick() is a                # its trial call
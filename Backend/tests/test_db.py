@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+
+from mini_jira_admin_agent import db
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    # db.py always works on ./database.db
+    monkeypatch.chdir(tmp_path)
+    db.init_db()
+    return tmp_path / "database.db"
+
+
+def test_many_tickets_per_user_keyed_by_ticket_id(fresh_db):
+    db.add_user(1, "Alice")
+    db.add_user(2, "Bob")
+    assert db.create_ticket("Fix login", "Alice") == "Ticket created with id 1."
+    assert db.create_ticket("Fix logout", "Alice") == "Ticket created with id 2."
+    assert db.create_ticket("Payments", "Bob") == "Ticket created with id 3."
+
+    assert db.view_ticket_title(2) == "Fix logout"
+    assert db.update_ticket_status(2, "in-progress") == "Ticket with id 2 status updated to IN_PROGRESS."
+    assert db.get_ticket(1).status == "OPEN"  # the other ticket of the same assignee is untouched
+
+    alice = db.list_tickets_all("ALL", assignee_id=1)
+    assert [t.id for t in alice] == [1, 2]
+    assert alice[1] == db.Ticket(2, "Fix logout", 1, "Alice", "IN_PROGRESS")
+
+    assert db.delete_ticket(1) == "Ticket with id 1 deleted successfully."
+    assert db.view_ticket_title(1) == "Ticket with id 1 does not exist."
+    assert [t.id for t in db.list_tickets_all("ALL")] == [2, 3]
+
+
+def test_migrate_drops_unique_assignee(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("database.db")
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+        CREATE TABLE tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            assignee_id INTEGER NOT NULL UNIQUE,
+            status TEXT CHECK(status IN ('OPEN', 'IN_PROGRESS', 'CLOSED')) DEFAULT 'OPEN',
+            FOREIGN KEY (assignee_id) REFERENCES users(id)
+        );
+        INSERT INTO users VALUES (1, 'Alice');
+        INSERT INTO tickets (id, title, assignee_id, status) VALUES (5, 'Old', 1, 'CLOSED');
+    """)
+    conn.close()
+
+    assert db.migrate_db() is True
+    assert db.migrate_db() is False
+    assert db.get_ticket(5) == db.Ticket(5, "Old", 1, "Alice", "CLOSED")
+    assert db.create_ticket("New", "Alice") == "Ticket created with id 6."
@@ -0,0 +1,35 @@
+import gzip
+import json
+
+from utils import fast_json
+
+
+ROWS = [
+    (1, 'Fix "login"', 1, "Alice", "OPEN"),
+    (2, "Café menu – broken", 2, "Zoë", "IN_PROGRESS"),
+    (3, None, 3, "Bob", "CLOSED"),
+]
+
+
+def test_encode_tickets_matches_json_dumps():
+    cols = ("id", "title", "assignee_id", "assignee", "status")
+    expected = json.dumps({"tickets": [dict(zip(cols, r)) for r in ROWS]}).encode("utf-8")
+    assert fast_json.encode_tickets(ROWS) == expected
+    assert fast_json.encode_tickets([]) == b'{"tickets": []}'
+
+
+def test_negotiate():
+    assert fast_json.negotiate(None) is None
+    assert fast_json.negotiate("identity") is None
+    assert fast_json.negotiate("gzip, deflate") == "gzip"
+    assert fast_json.negotiate("gzip;q=0") is None
+    expected_any = "br" if fast_json.brotli is not None else "gzip"
+    assert fast_json.negotiate("*") == expected_any
+
+
+def test_compress_skips_small_bodies():
+    small = b'{"tickets": []}'
+    assert fast_json.compress(small, "gzip") == (small, None)
+    big = fast_json.encode_tickets(ROWS * 200)
+    body, enc = fast_json.compress(big, "gzip")
+    assert enc == "gzip" and gzip.decompress(body) == big
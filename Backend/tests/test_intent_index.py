@@ -0,0 +1,166 @@
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+from langchain_core.messages import AIMessage
+
+from mini_jira_admin_agent import db, graph, intent_index
+from mini_jira_admin_agent.intent_index import IntentIndex, seed_examples
+
+
+@pytest.fixture
+def index(monkeypatch):
+    ix = IntentIndex.build(seed_examples())
+    monkeypatch.setattr(intent_index, "_index", ix)
+    return ix
+
+
+def test_seeds_include_router_prompt_examples():
+    pairs = seed_examples()
+    assert ("add user 1 Alice", "add_user") in pairs
+    assert all(intent != "clarify" for _, intent in pairs)
+
+
+def test_classifies_paraphrases(index):
+    assert index.classify("who's on the team?")[0] == "show_users"
+    assert index.classify("show me in-progress tickets")[0] == "list_tickets"
+    assert index.classify("delete ticket 42")[0] == "delete_ticket"
+    intent, confidence, margin = index.classify("remove user 17")
+    assert intent == "delete_user" and confidence > 0.9 and margin > 0
+
+
+def test_persisted_index_is_memory_mapped_and_grows(tmp_path):
+    path = str(tmp_path / "idx")
+    built = IntentIndex.open(path)
+    loaded = IntentIndex.open(path)
+    assert isinstance(loaded.vectors, np.memmap) and len(loaded) == len(built)
+
+    assert loaded.learn("who is working here", "show_users")
+    assert not loaded.learn("who is working here", "show_users")   # near-duplicate
+    loaded.save()
+    assert len(IntentIndex.load(path)) == len(built) + 1
+
+
+def test_index_built_from_other_seeds_is_rebuilt(tmp_path):
+    path = str(tmp_path / "idx")
+    old = IntentIndex.build(seed_examples()[:3] + [("wipe everything", "reset_database")], path)
+    old.save()
+    index = IntentIndex.open(path)
+    assert len(index) == len(seed_examples()) and "wipe everything" not in index.texts
+    assert IntentIndex.load(path).fingerprint == intent_index.seed_fingerprint(seed_examples())
+
+
+def test_saves_from_two_workers_merge_and_learning_is_capped(tmp_path):
+    path = str(tmp_path / "idx")
+    a, b = IntentIndex.open(path), IntentIndex.open(path)
+    assert a.learn("who is working here", "show_users")
+    assert b.learn("what is on the board", "list_tickets")
+    a.save()
+    b.save()    # merges a's example instead of overwriting it
+    saved = IntentIndex.load(path)
+    assert saved.texts[-2:] == ["who is working here", "what is on the board"]
+    assert "who is working here" in b.texts
+
+    b.max_learned = 2
+    assert not b.learn("anyone on staff", "show_users")
+
+def test_unwritable_path_falls_back_to_an_in_memory_index(tmp_path):
+    (tmp_path / "not-a-dir").write_text("")
+    index = IntentIndex.open(str(tmp_path / "not-a-dir" / "idx"))
+    assert index.path is None and len(index) == len(seed_examples())
+    assert index.learn("who is working here", "show_users")
+
+
+class NoLLM:
+    def submit(self, query):
+        raise AssertionError("pre-routed requests must not call the LLM")
+
+
+class ScriptedRouter:
+    def __init__(self, reply):
+        self.reply, self.queries = reply, []
+
+    def submit(self, query):
+        self.queries.append(query)
+        fut = Future()
+        fut.set_result(AIMessage(self.reply))
+        return fut
+
+    def wait(self, fut):
+        return fut.result()
+
+
+def test_confident_read_only_intents_skip_the_llm(index, monkeypatch):
+    monkeypatch.setattr(graph, "router_dispatcher", NoLLM())
+    route = graph._router_call({"messages": [{"role": "user", "content": "who's on the team?"}]})["router"]
+    assert route == {"intent": "show_users", "args": {}, "source": "index"}
+    route = graph._router_call({"messages": [{"role": "user", "content": "list closed tickets"}]})["router"]
+    assert route["args"] == {"kind": "closed"}
+
+
+@pytest.mark.parametrize("text", [
+    "show tickets for Alice",
+    "list Bob's tickets",
+    "show tickets for user three",
+    "show the team's tickets",
+])
+def test_ticket_lists_naming_someone_go_to_the_llm(index, monkeypatch, text):
+    router = ScriptedRouter('{"intent":"list_tickets","args":{"kind":"all","assignee_id":1}}')
+    monkeypatch.setattr(graph, "router_dispatcher", router)
+    route = graph._router_call({"messages": [{"role": "user", "content": text}]})["router"]
+    assert route["source"] == "llm" and route["args"] == {"kind": "all", "assignee_id": 1}
+    assert len(router.queries) == 1
+
+
+@pytest.mark.parametrize("history", [
+    [("user", "list tickets for a user"), ("assistant", "Which user? Or should I show all tickets?"), ("user", "show all")],
+    [("user", "create ticket Login bug"), ("assistant", "Who should it be assigned to?"), ("user", "show me the team")],
+    [("user", "show all")],
+    [("user", "display all")],
+])
+def test_follow_ups_and_bare_show_all_go_to_the_llm(index, monkeypatch, history):
+    router = ScriptedRouter('{"intent":"list_tickets","args":{"kind":"all"}}')
+    monkeypatch.setattr(graph, "router_dispatcher", router)
+    messages = [{"role": role, "content": text} for role, text in history]
+    route = graph._router_call({"messages": messages})["router"]
+    assert route["intent"] == "list_tickets" and route.get("source") != "index"
+    assert len(router.queries) == 1
+
+def test_llm_extracts_args_and_only_successful_reads_are_learned(index, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)    # the tools below use ./database.db
+    db.init_db()
+    db.add_user(1, "Alice")
+    db.create_ticket("Login bug", "Alice")
+    router = ScriptedRouter('{"intent":"view_ticket","args":{"ticket_id":9}}')
+    monkeypatch.setattr(graph, "router_dispatcher", router)
+    app = graph.build_app()
+
+    out = app.invoke({"messages": [{"role": "user", "content": "show ticket 9"}]})
+    assert out["messages"][-1]["content"] == "Ticket with id 9 does not exist."
+    assert 'most likely "view_ticket"' in router.queries[0][-1].content
+
+    before = len(index)
+    app.invoke({"messages": [{"role": "user", "content": "what does ticket number 9 say"}]})
+    assert len(index) == before    # a failed lookup confirms nothing
+
+    router.reply = '{"intent":"view_ticket","args":{"ticket_id":1}}'
+    out = app.invoke({"messages": [{"role": "user", "content": "what does ticket number 1 say"}]})
+    assert "does not exist" not in out["messages"][-1]["content"]
+    assert len(index) == before + 1 and index.labels[-1] == "view_ticket"
+
+    router.reply = '{"intent":"delete_ticket","args":{"ticket_id":1}}'
+    out = app.invoke({"messages": [{"role": "user", "content": "get rid of that login ticket number 1"}]})
+    assert out["messages"][-1]["content"] == "Ticket with id 1 deleted successfully."
+    assert len(index) == before + 1    # destructive intents are never learned
+
+def test_learning_failure_keeps_the_tool_result(index, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    db.init_db()
+    monkeypatch.setattr(graph, "router_dispatcher", ScriptedRouter('{"intent":"show_users","args":{}}'))
+
+    def broken_learn(text, intent):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(index, "learn", broken_learn)
+    out = graph.build_app().invoke({"messages": [{"role": "user", "content": "anyone around?"}]})
+    assert not out["messages"][-1]["content"].startswith("Error")
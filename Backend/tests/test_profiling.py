@@ -0,0 +1,56 @@
+import contextvars
+import threading
+import time
+
+from mini_jira_admin_agent.profiling import SamplingProfiler, SlowRequestLog, phase, record, recording
+
+
+def test_phases_are_recorded_only_inside_a_recording_context():
+    with phase("ignored"):
+        pass
+
+    with recording() as phases:
+        with phase("sqlite"):
+            time.sleep(0.01)
+        record("llm.queue", 2.5)
+        # worker threads see the recorder when the context is copied to them
+        ctx = contextvars.copy_context()
+        t = threading.Thread(target=ctx.run, args=(lambda: record("tabulate", 1.0),))
+        t.start()
+        t.join()
+    record("after", 1.0)    # the recorder is gone after the block
+    assert [name for name, _ in phases] == ["sqlite", "llm.queue", "tabulate"]
+    assert phases[0][1] >= 10
+
+
+def test_slow_request_log_is_a_bounded_ring_buffer():
+    log = SlowRequestLog(threshold_ms=100, size=2)
+    assert not log.maybe_capture("GET", "/api/users", 200, 5, [])
+    for i in range(3):
+        log.maybe_capture("POST", f"/api/chat/{i}", 200, 150, [("llm.ollama", 120.0), ("sqlite", 1.0), ("sqlite", 2.0)])
+    entries = log.entries()
+    assert [e["path"] for e in entries] == ["/api/chat/2", "/api/chat/1"]
+    assert entries[0]["phases"]["sqlite"] == {"ms": 3.0, "count": 2}
+    assert log.captured == 3
+
+
+def test_sampling_profiler_collects_collapsed_stacks():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_worker, name="busy")
+    worker.start()
+    prof = SamplingProfiler()
+    assert prof.start(seconds=0.2, interval=0.005)
+    assert not prof.start(seconds=1)    # one run at a time
+    prof.stop()
+    stop.set()
+    worker.join()
+
+    assert prof.status()["samples"] > 0
+    lines = prof.collapsed().splitlines()
+    assert any(line.startswith("busy;") and "test_profiling.py:busy_worker" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
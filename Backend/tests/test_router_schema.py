@@ -0,0 +1,69 @@
+from concurrent.futures import Future
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from mini_jira_admin_agent import graph, intent_index
+from mini_jira_admin_agent.router_schema import ROUTER_JSON_SCHEMA, INTENT_ARGS, RouteError, extract_json, parse_route
+
+
+def test_extract_json_recovers_first_object_from_noisy_output():
+    assert extract_json('{"intent":"show_users","args":{}}') == {"intent": "show_users", "args": {}}
+    noisy = 'Sure! ```json\n{"intent":"view_ticket","args":{"ticket_id":3}}\n``` -- Repiled by LLAMA {"x":1}'
+    assert extract_json(noisy) == {"intent": "view_ticket", "args": {"ticket_id": 3}}
+    assert extract_json("{not json} then {\"a\": 1}") == {"a": 1}
+    assert extract_json("no json here") is None
+
+
+def test_parse_route_normalizes_and_validates():
+    assert parse_route('{"intent":"update_status","args":{"ticket_id":"7","status":"in-progress"}}') == {
+        "intent": "update_status", "args": {"ticket_id": 7, "status": "IN_PROGRESS"},
+    }
+    assert parse_route('{"intent":"list_users","args":{}}')["intent"] == "show_users"
+    assert parse_route('{"intent":"list_tickets","args":{"kind":"In Progress"}}')["args"] == {"kind": "in_progress"}
+    clarify = parse_route('{"intent":"clarify","args":{"message":"Which user?"}}')
+    assert clarify["message"] == "Which user?"
+
+    with pytest.raises(RouteError, match="ticket_id"):
+        parse_route('{"intent":"delete_ticket","args":{"user_id":3}}')
+    with pytest.raises(RouteError, match="Unknown intent"):
+        parse_route('{"intent":"make_coffee","args":{}}')
+
+
+def test_schema_covers_every_intent():
+    intents = {branch["properties"]["intent"]["enum"][0] for branch in ROUTER_JSON_SCHEMA["anyOf"]}
+    assert intents == set(INTENT_ARGS)
+
+
+class ScriptedRouter:
+    def __init__(self, *replies):
+        self.replies = list(replies)
+
+    def submit(self, query):
+        fut = Future()
+        fut.set_result(AIMessage(self.replies.pop(0)))
+        return fut
+
+    def wait(self, fut):
+        return fut.result()
+
+
+def _route(monkeypatch, *replies):
+    monkeypatch.setattr(graph, "router_dispatcher", ScriptedRouter(*replies))
+    monkeypatch.setattr(intent_index, "_index", intent_index.IntentIndex.build([]))  # no pre-routing
+    before = graph.router_stats()
+    out = graph._router_call({"messages": [{"role": "user", "content": "x"}]})["router"]
+    after = graph.router_stats()
+    return out, {k: after.get(k, 0) - before.get(k, 0) for k in after}
+
+
+def test_router_recovers_repairs_and_falls_back(monkeypatch):
+    out, delta = _route(monkeypatch, 'Here you go: {"intent":"show_users","args":{}} -- Repiled by LLAMA')
+    assert out["intent"] == "show_users" and delta["llm_calls"] == 1 and delta["recovered"] == 1
+
+    out, delta = _route(monkeypatch, '{"intent":"view_ticket","args":{}}', '{"intent":"view_ticket","args":{"ticket_id":4}}')
+    assert (out["intent"], out["args"]) == ("view_ticket", {"ticket_id": 4})
+    assert delta["llm_calls"] == 2 and delta["repaired"] == 1
+
+    out, delta = _route(monkeypatch, "nope", "still nope")
+    assert out["intent"] == "unsupported" and delta["fallbacks"] == 1
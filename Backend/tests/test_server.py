@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from mini_jira_admin_agent import db
+from mini_jira_admin_agent.admission import AdmissionGate, RateLimiter
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)    # ./database.db and the intent index files
+    import server
+    db.init_db()
+    monkeypatch.setattr(server, "llm_gate", AdmissionGate(max_concurrent=1, max_queue=0, queue_timeout=1))
+    monkeypatch.setattr(server, "chat_limiter", RateLimiter(rate_per_min=0, burst=1))
+    return server
+
+
+class BlockingGraph:
+    "Stands in for the LangGraph app; each turn waits until released."
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def invoke(self, state):
+        self.release.wait(5)
+        return {"messages": state["messages"] + [{"role": "assistant", "content": "done"}]}
+
+
+def _wait_for(predicate):
+    deadline = time.monotonic() + 5
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_full_chat_gate_answers_429_until_the_turn_finishes(server, monkeypatch):
+    graph = BlockingGraph()
+    monkeypatch.setattr(server, "lang_app", graph)
+    client = TestClient(server.app)
+
+    first = []
+    t = threading.Thread(target=lambda: first.append(client.post("/api/chat", json={"message": "list users"})))
+    t.start()
+    _wait_for(lambda: server.llm_gate.stats()["admitted"] == 1)
+
+    shed = client.post("/api/chat", json={"message": "list users"})
+    assert shed.status_code == 429
+    assert int(shed.headers["Retry-After"]) >= 1
+
+    graph.release.set()
+    t.join()
+    assert first[0].json() == {"reply": "done"}
+    assert server.llm_gate.stats()["admitted"] == 0
+
+
+def test_rate_limited_client_gets_429_with_retry_after(server, monkeypatch):
+    graph = BlockingGraph()
+    graph.release.set()
+    monkeypatch.setattr(server, "lang_app", graph)
+    monkeypatch.setattr(server, "chat_limiter", RateLimiter(rate_per_min=1, burst=1))
+    client = TestClient(server.app)
+
+    assert client.post("/api/chat", json={"message": "hi"}).status_code == 200
+    limited = client.post("/api/chat", json={"message": "hi"})
+    assert limited.status_code == 429
+    assert 1 <= int(limited.headers["Retry-After"]) <= 60
+
+
+def test_disconnected_chat_keeps_its_place_until_the_graph_finishes(server, monkeypatch):
+    graph = BlockingGraph()
+    monkeypatch.setattr(server, "lang_app", graph)
+    request = Request({"type": "http", "method": "POST", "path": "/api/chat", "headers": [], "client": ("10.0.0.1", 5000)})
+
+    async def disconnect():
+        task = asyncio.ensure_future(server.chat(server.ChatIn(message="list users"), request))
+        await asyncio.sleep(0.1)
+        task.cancel()    # the client goes away; the turn keeps running on the chat pool
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(disconnect())
+    assert server.llm_gate.stats()["admitted"] == 1
+    graph.release.set()
+    _wait_for(lambda: server.llm_gate.stats()["admitted"] == 0)
+
+
+def test_admin_endpoints_need_the_token(server, monkeypatch):
+    client = TestClient(server.app)
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "")
+    assert client.get("/api/admin/profile").status_code == 404    # disabled
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "sécret")
+    assert client.get("/api/admin/profile").status_code == 403
+    assert client.get("/api/admin/profile", headers={"X-Admin-Token": "secret"}).status_code == 403
+    assert client.get("/api/admin/profile", headers={b"X-Admin-Token": "sécret".encode()}).status_code == 200
+
+
+def test_slow_requests_are_captured_with_phases_even_when_the_route_raises(server, monkeypatch):
+    monkeypatch.setattr(server.slow_requests, "threshold_ms", 0)
+    client = TestClient(server.app, raise_server_exceptions=False)
+    before = server.slow_requests.captured
+
+    assert client.get("/api/users").status_code == 200
+
+    class BrokenReads:
+        def stats(self):
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(server, "_reads", BrokenReads())
+    assert client.get("/api/metrics/coalescing").status_code == 500
+    client.get("/api/admin/slow-requests")    # admin requests are not captured
+
+    assert server.slow_requests.captured == before + 2
+    failed, listed = server.slow_requests.entries()[:2]
+    assert (failed["path"], failed["status"]) == ("/api/metrics/coalescing", 500)
+    assert (listed["path"], listed["status"]) == ("/api/users", 200)
+    assert "sqlite" in listed["phases"]
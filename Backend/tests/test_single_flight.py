@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    sf = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow_query():
+        calls.append(1)
+        release.wait(2)
+        return b'{"users": []}'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sf.do(("users",), slow_query))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while sf.stats()["coalesced"] < 7:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [b'{"users": []}'] * 8
+    assert sf.stats() == {"leaders": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_error_is_shared_and_not_cached():
+    sf = SingleFlight()
+
+    def boom():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        sf.do("k", boom)
+    assert sf.do("k", lambda: 42) == 42
+
+
+def test_forget_starts_a_fresh_flight():
+    sf = SingleFlight()
+    release = threading.Event()
+    first = []
+    t = threading.Thread(target=lambda: first.append(sf.do("k", lambda: release.wait(2) and "stale")))
+    t.start()
+    while sf.stats()["in_flight"] == 0:
+        time.sleep(0.01)
+
+    sf.forget()
+    assert sf.do("k", lambda: "fresh") == "fresh"
+    release.set()
+    t.join()
+    assert first == ["stale"]
+
+
+def test_nested_uncounted_flight_counts_each_request_once():
+    sf = SingleFlight()
+    body = sf.do(("tickets", "gzip"), lambda: sf.do(("tickets",), lambda: b"[]", count=False) + b"gz")
+    assert body == b"[]gz"
+    assert sf.stats() == {"leaders": 1, "coalesced": 0, "in_flight": 0}
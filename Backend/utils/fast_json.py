@@ -0,0 +1,78 @@
+import gzip
+import json
+from json.encoder import encode_basestring_ascii as _q
+from typing import Iterable, Optional, Tuple
+
+try:  # optional, used for generic payloads when installed
+    import orjson
+except ImportError:
+    orjson = None
+
+try:  # optional, enables Content-Encoding: br
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves.
+MIN_COMPRESS_SIZE = 1024
+
+
+def dumps(obj) -> bytes:
+    "Serialize an arbitrary JSON payload, using orjson when available."
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def _str(v) -> str:
+    return "null" if v is None else _q(v)
+
+
+def _int(v) -> str:
+    return "null" if v is None else str(int(v))
+
+
+def encode_tickets(rows: Iterable[tuple]) -> bytes:
+    """
+    Build {"tickets": [...]} straight from db.Ticket rows (or any
+    (id, title, assignee_id, assignee, status) tuples). Output is byte-identical
+    to json.dumps on the equivalent dicts, without building those dicts.
+    """
+    parts = [
+        '{"id": %s, "title": %s, "assignee_id": %s, "assignee": %s, "status": %s}'
+        % (_int(tid), _str(title), _int(aid), _str(assignee), _str(status))
+        for tid, title, aid, assignee, status in rows
+    ]
+    return ('{"tickets": [' + ", ".join(parts) + "]}").encode("ascii")
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    "Pick 'br' or 'gzip' from an Accept-Encoding header, or None for identity."
+    if not accept_encoding:
+        return None
+    offered = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    for enc in ("br", "gzip"):
+        if enc == "br" and brotli is None:
+            continue
+        if offered.get(enc, offered.get("*", 0.0)) > 0:
+            return enc
+    return None
+
+
+def compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    "Return (body, content_encoding); small bodies or encoding=None pass through."
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=5), "br"
+    return gzip.compress(body, compresslevel=6), "gzip"
@@ -0,0 +1,71 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    "One in-flight computation that followers wait on."
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one execution.
+    The first caller for a key (the leader) runs fn; callers that arrive while it
+    is still running wait and receive the same result (or exception).
+    Nothing is cached once the leader finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], count: bool = True) -> Any:
+        "count=False for a flight nested inside another one, so a request is counted once."
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            if count:
+                if leader:
+                    self.leaders += 1
+                else:
+                    self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def forget(self) -> None:
+        "Detach all in-flight calls so later callers start a fresh one (use after writes)."
+        with self._lock:
+            self._calls.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }